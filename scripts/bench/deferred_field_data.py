@@ -0,0 +1,62 @@
+"""Benchmark listing the letters of a shipment with and without loading the encrypted field data.
+
+Times OpenPostbud.database.digital_post.letters.get_letters, which defers the
+field data, against the same query loading the full rows like it did before.
+The letters are added to a temporary database using a temporary configuration.
+
+Usage:
+    python scripts/bench/deferred_field_data.py [number of letters, default 50000]
+"""
+
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from test_config import use_test_config  # noqa: E402  pylint: disable=wrong-import-position
+
+
+FIELD_DATA = {"Navn": "Some Name", "Adresse": "Some street 12", "Beløb": "1234"}
+
+
+def time_best_of_five(func) -> float:
+    """Get the best time of five calls in seconds."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Run the benchmark."""
+    letter_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    use_test_config()
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import select
+    from OpenPostbud.database import connection
+    from OpenPostbud.database.digital_post import letters, shipments, templates
+    from OpenPostbud.database.digital_post.letters import Letter
+    # pylint: enable=import-outside-toplevel
+
+    connection.create_tables()
+    template_id = templates.add_template("Letter.pdf", b"")
+    shipment_id = shipments.add_shipment("Benchmark", "", "bench", template_id)
+    letters.add_letters(shipment_id, [{letters.MemoFields.MEMO_MODTAGER.key: f"{i:010d}", **FIELD_DATA} for i in range(letter_count)])
+
+    def get_full_letters() -> tuple[Letter]:
+        with connection.get_session() as session:
+            return tuple(session.execute(select(Letter).where(Letter.shipment_id == shipment_id)).scalars())
+
+    assert len(letters.get_letters(shipment_id)) == letter_count
+
+    for name, func in (("full rows", get_full_letters), ("letters.get_letters", lambda: letters.get_letters(shipment_id))):
+        seconds = time_best_of_five(func)
+        print(f"{name:20}: {letter_count / seconds:7,.0f} rows/s ({seconds:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark queries on Fernet encrypted columns with SQLAlchemy's statement cache disabled and enabled.
+
+EncryptedString.cache_ok decides whether statements selecting an encrypted column
+can be cached. SQLAlchemy memoizes the setting on the type the first time it's used,
+so each setting runs in its own process with a temporary configuration and database.
+The queries are OpenPostbud's own lookup functions.
+
+Usage:
+    python scripts/bench/encrypted_columns.py [lookups per run, default 1000]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from pathlib import Path
+import sys
+import time
+import warnings
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from test_config import use_test_config  # noqa: E402  pylint: disable=wrong-import-position
+
+
+SHIPMENT_COUNT = 20
+LETTERS_PER_SHIPMENT = 100
+
+
+def time_best_of_seven(func, count: int) -> float:
+    """Get the best mean time of seven runs of count calls in seconds."""
+    best = float("inf")
+    for _ in range(7):
+        start = time.perf_counter()
+        for i in range(count):
+            func(i)
+        best = min(best, (time.perf_counter() - start) / count)
+    return best
+
+
+def run(cache_ok: bool, lookup_count: int) -> dict[str, float]:
+    """Time the lookups with the given cache_ok setting.
+
+    Returns:
+        A dict of lookup names to mean times in seconds.
+    """
+    use_test_config()
+
+    # pylint: disable=import-outside-toplevel
+    from OpenPostbud.database import connection
+    from OpenPostbud.database.data_types.encrypted_string import EncryptedString
+    from OpenPostbud.database.digital_post import letters, shipments, templates
+    # pylint: enable=import-outside-toplevel
+
+    # Must be set before the type is used in any statement
+    EncryptedString.cache_ok = cache_ok
+    # SQLAlchemy warns about the type when caching is disabled
+    warnings.simplefilter("ignore")
+
+    connection.create_tables()
+    template_id = templates.add_template("Letter.pdf", b"")
+    shipment_ids = []
+    for s in range(SHIPMENT_COUNT):
+        shipment_ids.append(shipments.add_shipment("Benchmark", "", "bench", template_id))
+        letters.add_letters(shipment_ids[-1], [
+            {letters.MemoFields.MEMO_MODTAGER.key: f"{s * LETTERS_PER_SHIPMENT + i:010d}", "Navn": "Some Name"}
+            for i in range(LETTERS_PER_SHIPMENT)
+        ])
+
+    assert letters.get_letters_by_recipient("0000000005")[0].recipient_id == "0000000005"
+
+    return {
+        "get_letters_by_recipient": time_best_of_seven(lambda i: letters.get_letters_by_recipient(f"{i % (SHIPMENT_COUNT * LETTERS_PER_SHIPMENT):010d}"), lookup_count),
+        f"get_letters ({LETTERS_PER_SHIPMENT} letters)": time_best_of_seven(lambda i: letters.get_letters(shipment_ids[i % SHIPMENT_COUNT]), lookup_count // 10),
+    }
+
+
+def main():
+    """Run the benchmark."""
+    lookup_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    results = {}
+    for cache_ok in (False, True):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results[cache_ok] = executor.submit(run, cache_ok, lookup_count).result()
+
+    for name, uncached in results[False].items():
+        print(f"{name:28} cache_ok False {uncached * 1e6:7.0f} us -> cache_ok True {results[True][name] * 1e6:7.0f} us")
+
+
+if __name__ == "__main__":
+    main()
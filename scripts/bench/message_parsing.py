@@ -0,0 +1,88 @@
+"""Benchmark parsing of saved message broker messages.
+
+Runs OpenPostbud.workers.message_broker_worker.handle_message on every message
+in the given folder, e.g. the 'failed_messages' folder of the worker or messages
+saved from the queue. For comparison the same fields are read using ElementTree's
+find with namespace maps, like the worker did before it used lxml. The paths are
+taken from the worker's compiled XPath expressions.
+Messages that handle_message doesn't recognize are skipped.
+
+Usage:
+    python scripts/bench/message_parsing.py <message folder> [iterations, default 100]
+"""
+
+import base64
+import logging
+from pathlib import Path
+import sys
+import time
+from types import ModuleType
+from xml.etree import ElementTree
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from test_config import use_test_config  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def parse_element_tree(message: bytes, mbw: ModuleType) -> tuple[str, str, str, str]:
+    """Read the fields used by the worker using ElementTree.find.
+
+    Args:
+        message: The raw XML message.
+        mbw: The message broker worker module.
+
+    Returns:
+        The sender uuid, event uuid, message time and transaction id of the message.
+    """
+    envelope_tree = ElementTree.fromstring(message)
+    sender_uuid = envelope_tree.find(mbw.SENDER_UUID_PATH.path.removesuffix("/text()"), mbw.ENVELOPE_NAMESPACES).text
+    event_uuid = envelope_tree.find(mbw.EVENT_UUID_PATH.path.removesuffix("/text()"), mbw.ENVELOPE_NAMESPACES).text
+    message_time = envelope_tree.find(mbw.MESSAGE_TIME_PATH.path.removesuffix("/text()"), mbw.ENVELOPE_NAMESPACES).text
+    message_data = base64.b64decode(envelope_tree.find(mbw.MESSAGE_DATA_PATH.path.removesuffix("/text()"), mbw.ENVELOPE_NAMESPACES).text)
+
+    message_tree = ElementTree.fromstring(message_data)
+    transaction_path = mbw.MESSAGE_UUID_PATH if mbw.SENDERS.get(sender_uuid) == "Digital Post" else mbw.AFSENDELSE_ID_PATH
+    transaction_id = message_tree.find(transaction_path.path.removesuffix("/text()"), mbw.MESSAGE_NAMESPACES).text
+
+    return sender_uuid, event_uuid, message_time, transaction_id
+
+
+def main():
+    """Run the benchmark."""
+    message_folder = Path(sys.argv[1]).absolute()
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    use_test_config()
+    from OpenPostbud.workers import message_broker_worker  # pylint: disable=import-outside-toplevel
+
+    # Keep the worker's log lines out of the measurement
+    logging.disable(logging.ERROR)
+
+    messages = []
+    for file_path in sorted(message_folder.glob("*.xml")):
+        message = file_path.read_bytes()
+        try:
+            status_update = message_broker_worker.handle_message(message)
+        except message_broker_worker.MESSAGE_FORMAT_ERRORS:
+            status_update = None
+
+        if status_update:
+            assert parse_element_tree(message, message_broker_worker)[3] == status_update.transaction_id
+            messages.append(message)
+
+    print(f"Messages: {len(messages)} recognized, skipped {len(list(message_folder.glob('*.xml'))) - len(messages)}")
+    if not messages:
+        return
+
+    for name, parse in (
+        ("ElementTree find", lambda message: parse_element_tree(message, message_broker_worker)),
+        ("handle_message", message_broker_worker.handle_message)
+    ):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for message in messages:
+                parse(message)
+        print(f"{name:20} {(time.perf_counter() - start) / (iterations * len(messages)) * 1e6:6.1f} us per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark the per request overhead of OpenPostbud's authentication and audit log middleware.
+
+Requests are sent as raw ASGI calls through the real AuthMiddleware and AuditMiddleware
+with the router prefixes used by the app, so no HTTP client or server is measured.
+NiceGUI's session and request tracking middleware, which sit outside OpenPostbud's,
+are stood in for by setting the request context of an authenticated user session.
+The audit log writer runs and flushes to a temporary database like in the app.
+
+For comparison the same endpoints are timed without middleware and with two empty
+BaseHTTPMiddleware layers, which is the machinery the middleware used before.
+
+Usage:
+    python scripts/bench/middleware.py [requests per run, default 3000]
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from test_config import use_test_config  # noqa: E402  pylint: disable=wrong-import-position
+
+
+SESSION_ID = "bench"
+ENDPOINT_APP = Starlette(routes=[
+    Route("/api/hello", lambda request: JSONResponse({"response": "hello"})),
+    Route("/user/forsendelser", lambda request: HTMLResponse("<html>" + "x" * 20000 + "</html>")),
+])
+
+
+class SessionContext:
+    """Stands in for NiceGUI's session and request tracking middleware
+    by setting the session id and the request context of the request.
+    """
+    def __init__(self, next_app: ASGIApp):
+        self.next_app = next_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        from nicegui.storage import request_contextvar  # pylint: disable=import-outside-toplevel
+
+        scope["session"] = {"id": SESSION_ID}
+        token = request_contextvar.set(Request(scope))
+        try:
+            await self.next_app(scope, receive, send)
+        finally:
+            request_contextvar.reset(token)
+
+
+async def call_app(app: ASGIApp, path: str):
+    """Send a GET request to the app as a raw ASGI call."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1234), "server": ("bench", 80)
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, f"{path} responded {message['status']}"
+
+    await app(scope, receive, send)
+
+
+async def time_requests(app: ASGIApp, path: str, request_count: int) -> float:
+    """Get the best mean time per request of three runs in seconds."""
+    # Warm up
+    for _ in range(200):
+        await call_app(app, path)
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(request_count):
+            await call_app(app, path)
+        best = min(best, (time.perf_counter() - start) / request_count)
+
+    return best
+
+
+async def main():
+    """Run the benchmark."""
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+
+    use_test_config(audit_log_queue_size="1000000")
+
+    # pylint: disable=import-outside-toplevel
+    from nicegui import app as nicegui_app
+    from sqlalchemy import func, select
+    from OpenPostbud.database import connection
+    from OpenPostbud.database.audit_log import AuditLog
+    from OpenPostbud.middleware import authentication
+    from OpenPostbud.middleware.audit_log import AuditMiddleware, audit_log_writer
+    from OpenPostbud.middleware.authentication import AuthMiddleware
+    from OpenPostbud.routes.admin.router import router as admin_router
+    from OpenPostbud.routes.user.router import router as user_router
+    # pylint: enable=import-outside-toplevel
+
+    connection.create_tables()
+
+    # Log in the benchmark session
+    await nicegui_app.storage._create_user_storage(SESSION_ID)  # pylint: disable=protected-access
+    user_storage = nicegui_app.storage._users[SESSION_ID]  # pylint: disable=protected-access
+    user_storage[authentication.AUTH_USER_KEY] = "bench"
+    user_storage[authentication.AUTH_EXPIRY_KEY] = (datetime.now() + timedelta(days=1)).isoformat()
+
+    async def empty_dispatch(request, call_next):
+        return await call_next(request)
+
+    apps = {
+        "OpenPostbud middleware": SessionContext(AuthMiddleware(AuditMiddleware(ENDPOINT_APP), user_router.prefix, admin_router.prefix)),
+        "2 BaseHTTPMiddleware": SessionContext(BaseHTTPMiddleware(BaseHTTPMiddleware(ENDPOINT_APP, empty_dispatch), empty_dispatch)),
+        "no middleware": SessionContext(ENDPOINT_APP),
+    }
+
+    await audit_log_writer.start()
+
+    for path in ("/api/hello", "/user/forsendelser"):
+        for name, app in apps.items():
+            seconds = await time_requests(app, path, request_count)
+            print(f"{path:20} {name:24} {seconds * 1e6:6.0f} us per request")
+
+    await audit_log_writer.stop()
+
+    with connection.get_session() as session:
+        print(f"Audit logs written: {session.execute(select(func.count()).select_from(AuditLog)).scalar()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
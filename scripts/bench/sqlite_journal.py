@@ -0,0 +1,113 @@
+"""Benchmark concurrent reads and writes in SQLite with the previous and the current connection profile.
+
+Each profile runs in its own process with a temporary configuration, so the
+database is connected through OpenPostbud.database.connection with the pragmas it sets.
+A reader counts the sent letters of a shipment in a loop while a writer thread
+commits status updates of 50 letters at a time. This mimics the web app reading
+while the workers write. The number of reads and write transactions and the
+read latency are printed for each profile.
+
+Usage:
+    python scripts/bench/sqlite_journal.py [seconds per profile, default 3]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from pathlib import Path
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from test_config import use_test_config  # noqa: E402  pylint: disable=wrong-import-position
+
+
+LETTER_COUNT = 20000
+UPDATES_PER_TRANSACTION = 50
+
+# The previous profile is SQLite's defaults
+PROFILES = {
+    "DELETE, synchronous FULL": {"database_journal_mode": "DELETE", "database_synchronous": "FULL", "database_mmap_size_mb": "0", "database_cache_size": "-2000"},
+    "WAL, synchronous NORMAL": {},
+}
+
+
+def run(settings: dict[str, str], duration: float) -> tuple[list[float], int]:
+    """Run the reader and writer for the given duration with the given settings.
+
+    Returns:
+        A tuple of (read times in seconds, number of write transactions).
+    """
+    use_test_config(**settings)
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import func, select, update
+    from OpenPostbud.database import connection
+    from OpenPostbud.database.common import ShipmentStatus
+    from OpenPostbud.database.digital_post import letters, shipments, templates
+    from OpenPostbud.database.digital_post.letters import Letter
+    # pylint: enable=import-outside-toplevel
+
+    connection.create_tables()
+    template_id = templates.add_template("Letter.pdf", b"")
+    shipment_id = shipments.add_shipment("Benchmark", "", "bench", template_id)
+    letters.add_letters(shipment_id, [{letters.MemoFields.MEMO_MODTAGER.key: f"{i:010d}"} for i in range(LETTER_COUNT)])
+
+    with connection.get_session() as session:
+        letter_ids = list(session.execute(select(Letter.id)).scalars())
+
+    stop = threading.Event()
+    write_count = 0
+
+    def write():
+        nonlocal write_count
+        while not stop.is_set():
+            with connection.get_session() as session:
+                session.execute(
+                    update(Letter)
+                    .where(Letter.id.in_(random.sample(letter_ids, UPDATES_PER_TRANSACTION)))
+                    .values(status=ShipmentStatus.SENT)
+                )
+                # Hold the write lock a little like a worker processing its batch
+                time.sleep(0.002)
+                session.commit()
+            write_count += 1
+
+    writer_thread = threading.Thread(target=write)
+    writer_thread.start()
+
+    read_times = []
+    end_time = time.time() + duration
+    while time.time() < end_time:
+        start = time.perf_counter()
+        with connection.get_session() as session:
+            session.execute(
+                select(func.count()).select_from(Letter)
+                .where(Letter.shipment_id == shipment_id, Letter.status == ShipmentStatus.SENT)
+            ).scalar()
+        read_times.append(time.perf_counter() - start)
+
+    stop.set()
+    writer_thread.join()
+    connection.get_connection_engine().dispose()
+
+    return read_times, write_count
+
+
+def main():
+    """Run the benchmark."""
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    for name, settings in PROFILES.items():
+        # The configuration is read once per process
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            read_times, write_count = executor.submit(run, settings, duration).result()
+
+        read_times.sort()
+        p99 = read_times[int(len(read_times) * 0.99)] * 1000
+        print(f"{name:25} {len(read_times):5} reads (p99 {p99:5.1f} ms) {write_count:5} write transactions")
+
+
+if __name__ == "__main__":
+    main()
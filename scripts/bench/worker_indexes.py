@@ -0,0 +1,128 @@
+"""Benchmark the worker claim and shipment status queries before and after
+the indexes of migration 006_add_worker_indexes.
+
+A temporary SQLite database is migrated with OpenPostbud's migration steps except 006
+and filled with letters spread over 200 shipments, of which the last 5000 are waiting.
+OpenPostbud's claim and status functions are timed, migration 006 is applied
+and the functions are timed again. Letters claimed while timing are reset to waiting.
+
+Usage:
+    python scripts/bench/worker_indexes.py [number of letters, default 200000]
+"""
+
+from datetime import datetime, timedelta
+import itertools
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from test_config import use_test_config  # noqa: E402  pylint: disable=wrong-import-position
+
+
+INDEX_MIGRATION = "006_add_worker_indexes"
+
+SHIPMENT_COUNT = 200
+WAITING_COUNT = 5000
+RUNS = 20
+
+
+def main():
+    """Run the benchmark."""
+    letter_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    use_test_config(shipment_worker_delay="0")
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import insert, update
+    from OpenPostbud.database import connection, db_util
+    from OpenPostbud.database.common import ShipmentStatus
+    from OpenPostbud.database.digital_post import letters, templates
+    from OpenPostbud.database.digital_post.letters import Letter, RenderStatus
+    from OpenPostbud.database.digital_post.shipments import Shipment
+    from OpenPostbud.database.migrations import migrate
+    from OpenPostbud.workers import render_worker, shipment_worker
+    # pylint: enable=import-outside-toplevel
+
+    migrate.create_migrations_table()
+    for file_path in sorted(migrate.MIGRATIONS_FOLDER.iterdir()):
+        if file_path.stem != INDEX_MIGRATION:
+            migrate.perform_step(file_path)
+
+    print(f"Adding {letter_count} letters")
+    start = datetime(2026, 1, 1)
+    template_id = templates.add_template("Letter.pdf", b"")
+    shipment_ids = [f"S-{i:010d}" for i in range(SHIPMENT_COUNT)]
+
+    with connection.get_session() as session:
+        session.execute(insert(Shipment), [
+            {"id": shipment_id, "name": "Benchmark", "description": "", "template_id": template_id, "created_by": "bench", "created_at": start + timedelta(hours=i)}
+            for i, shipment_id in enumerate(shipment_ids)
+        ])
+
+        letter_dicts = (
+            {
+                "id": f"L-{i:010d}",
+                "shipment_id": shipment_ids[i * SHIPMENT_COUNT // letter_count],
+                "recipient_id": f"{i:010d}",
+                "field_data": "{}",
+                "updated_at": start + timedelta(seconds=i),
+                "status": ShipmentStatus.WAITING if i >= letter_count - WAITING_COUNT else random.choice([ShipmentStatus.SENT, ShipmentStatus.DELIVERED, ShipmentStatus.FAILED]),
+                "render_status": RenderStatus.RENDERED
+            }
+            for i in range(letter_count)
+        )
+        for batch in itertools.batched(letter_dicts, 10000):
+            session.execute(insert(Letter), batch)
+        session.commit()
+
+    # The last shipment holds the waiting letters
+    shipment_id = shipment_ids[-1]
+
+    def claim_letters():
+        claimed = shipment_worker.get_waiting_letters(50)
+        assert len(claimed) == 50
+        return claimed
+
+    def reset_letters(claimed: tuple[Letter]):
+        with connection.get_session() as session:
+            session.execute(update(Letter).where(Letter.id.in_([letter.id for letter in claimed])).values(status=ShipmentStatus.WAITING))
+            session.commit()
+
+    functions = {
+        "shipment_worker.get_waiting_letters(50)": (claim_letters, reset_letters),
+        "render_worker.get_unrendered_letters(50)": (lambda: render_worker.get_unrendered_letters(50), None),
+        "db_util.calculate_shipment_status": (lambda: db_util.calculate_shipment_status(shipment_id), None),
+        f"letters.get_letters ({WAITING_COUNT} rows)": (lambda: letters.get_letters(shipment_id), None),
+    }
+
+    def time_functions() -> dict[str, float]:
+        """Get the mean time of each function in milliseconds."""
+        times = {}
+        for name, (func, clean_up) in functions.items():
+            total = 0
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                result = func()
+                total += time.perf_counter() - start
+                if clean_up:
+                    clean_up(result)
+            times[name] = total / RUNS * 1000
+        return times
+
+    before = time_functions()
+
+    migrate.perform_step(migrate.MIGRATIONS_FOLDER / f"{INDEX_MIGRATION}.sql")
+    with connection.get_connection_engine().begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    after = time_functions()
+
+    print(f"{letter_count} letters, mean of {RUNS} runs")
+    for name, before_ms in before.items():
+        print(f"{name:42} {before_ms:8.1f} ms -> {after[name]:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Set up a throwaway configuration to run OpenPostbud's code outside the app,
+e.g. in the benchmark and smoke test scripts.
+
+OpenPostbud.config reads the .env file in the current working directory when it's
+first imported, so use_test_config must be called before any OpenPostbud module is imported.
+OpenPostbud must be installed, e.g. using `pip install -e .`.
+"""
+
+import atexit
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+from cryptography.fernet import Fernet
+
+
+ENV_EXAMPLE_PATH = Path(__file__).parents[1] / ".env.example"
+
+
+def use_test_config(**settings: str) -> Path:
+    """Write a .env file based on .env.example to a new temporary folder
+    and change the working directory to it.
+    The database is an SQLite file in the folder unless 'database_url' is given.
+    The folder is deleted when the process exits.
+
+    Args:
+        **settings: Environment variables overriding the values of .env.example.
+
+    Returns:
+        The path of the temporary folder.
+    """
+    folder = Path(tempfile.mkdtemp(prefix="openpostbud_"))
+    atexit.register(shutil.rmtree, folder, ignore_errors=True)
+
+    cert_path = folder / "certificate.pem"
+    cert_path.touch()
+
+    values = {
+        "database_storage_secret": Fernet.generate_key().decode(),
+        "database_url": f"sqlite+pysqlite:///{folder / 'database.db'}",
+        "kombit_cert_path": str(cert_path),
+        "worker_signal_folder": str(folder / "worker_signals"),
+        **settings
+    }
+
+    # Later lines override the values of .env.example
+    lines = [ENV_EXAMPLE_PATH.read_text(), *(f"{key}={value}" for key, value in values.items())]
+    (folder / ".env").write_text("\n".join(lines) + "\n")
+
+    os.chdir(folder)
+    return folder
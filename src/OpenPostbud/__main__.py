@@ -2,11 +2,11 @@
 
 import argparse
 
-from OpenPostbud.database.check_registration import registration_job
+from OpenPostbud.database.check_registration import registration_job, registration_cache
 from OpenPostbud.database.digital_post import shipments
 from OpenPostbud.database.nemsms import nemsms_shipments
 from OpenPostbud.middleware import authentication
-from OpenPostbud.database import connection
+from OpenPostbud.database import connection, db_util
 from OpenPostbud.database.migrations import migrate
 
 
@@ -20,6 +20,7 @@ def database_cleanup(*_):
     shipments.delete_old_shipments()
     registration_job.delete_old_registration_jobs()
     nemsms_shipments.delete_old_shipments()
+    registration_cache.delete_expired_registrations()
 
 
 def create_database(*_):
@@ -33,6 +34,11 @@ def migrate_database(*_):
     migrate.perform_migrations()
 
 
+def backfill_blind_indexes(*_):
+    """The function to run on the 'backfill_blind_indexes' subcommand."""
+    db_util.backfill_blind_indexes()
+
+
 def main():
     """Main entry point for the CLI."""
     parser = argparse.ArgumentParser(
@@ -54,6 +60,9 @@ def main():
     migrate_db_parser = subparsers.add_parser("migrate_database", help="Perform database migrations.")
     migrate_db_parser.set_defaults(func=migrate_database)
 
+    backfill_parser = subparsers.add_parser("backfill_blind_indexes", help="Add blind indexes to recipients stored before blind indexes were introduced.")
+    backfill_parser.set_defaults(func=backfill_blind_indexes)
+
     args = parser.parse_args()
     args.func(args)
 
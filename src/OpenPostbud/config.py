@@ -6,6 +6,7 @@ import os
 import logging
 import json
 from importlib import metadata
+import tempfile
 
 import dotenv
 
@@ -51,11 +52,25 @@ SHIPMENT_LIFETIME_DAYS = int(os.environ['shipment_lifetime_days'])
 REGISTRATION_JOB_LIFETIME_DAYS = int(os.environ['registration_job_lifetime_days'])
 OPENPOSTBUD_VERSION = metadata.version("OpenPostbud")
 
+# Database
+DATABASE_URL = os.getenv("database_url", "sqlite+pysqlite:///database.db")
+DATABASE_JOURNAL_MODE = os.getenv("database_journal_mode", "WAL")
+DATABASE_SYNCHRONOUS = os.getenv("database_synchronous", "NORMAL")
+DATABASE_BUSY_TIMEOUT_MS = int(os.getenv("database_busy_timeout_ms", "5000"))
+DATABASE_MMAP_SIZE_MB = int(os.getenv("database_mmap_size_mb", "256"))
+DATABASE_CACHE_SIZE = int(os.getenv("database_cache_size", "-64000"))
+
 # API
 API_JWT_SECRET = os.environ["api_jwt_secret"]
 API_TOKEN_LIFETIME_SECONDS = int(os.getenv("api_token_lifetime_seconds", "3600"))
+API_KEY_CACHE_SECONDS = int(os.getenv("api_key_cache_seconds", "300"))
+
+# Audit log
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv("audit_log_queue_size", "10000"))
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv("audit_log_flush_seconds", "1"))
 
 # Workers
+WORKER_SIGNAL_FOLDER = os.path.abspath(os.getenv("worker_signal_folder") or os.path.join(tempfile.gettempdir(), "openpostbud_worker_signals"))
 CVR = os.environ['cvr']
 KOMBIT_CERT_PATH = os.environ['kombit_cert_path']
 if not os.path.isfile(KOMBIT_CERT_PATH):
@@ -64,16 +79,29 @@ KOMBIT_TEST_ENV = str_to_bool(os.environ['Kombit_test_env'])
 
 # Registration worker
 REGISTRATION_WORKER_SLEEP_TIME = float(os.environ['registration_worker_sleep_time'])
+REGISTRATION_WORKER_BATCH_SIZE = int(os.getenv("registration_worker_batch_size", "50"))
+REGISTRATION_WORKER_CONCURRENCY = int(os.getenv("registration_worker_concurrency", "1"))
+REGISTRATION_TASK_TIMEOUT = int(os.getenv("registration_task_timeout", "600"))
+REGISTRATION_CACHE_SECONDS = int(os.getenv("registration_cache_seconds", "86400"))
 
 # Shipment worker
 SHIPMENT_WORKER_SLEEP_TIME = float(os.environ['shipment_worker_sleep_time'])
 SENDER_LABEL = os.environ['sender_label']
 SHIPMENT_WORKER_DELAY = int(os.getenv("shipment_worker_delay", "300"))
+SHIPMENT_WORKER_BATCH_SIZE = int(os.getenv("shipment_worker_batch_size", "50"))
+SHIPMENT_WORKER_CONCURRENCY = int(os.getenv("shipment_worker_concurrency", "1"))
 PHYSICAL_MAIL_FORSENDELSE_TYPE = int(os.environ['physical_mail_forsendelse_type'])
 
+# Render worker
+RENDER_WORKER_SLEEP_TIME = float(os.getenv("render_worker_sleep_time", "10"))
+RENDER_WORKER_BATCH_SIZE = int(os.getenv("render_worker_batch_size", "50"))
+CONVERTER_BATCH_SIZE = int(os.getenv("converter_batch_size", "10"))
+MERGE_PROCESSES = int(os.getenv("merge_processes", "1"))
+
 # Message broker worker
 MESSAGE_BROKER_QUEUE_ID = os.environ['message_broker_queue_id']
 MESSAGE_BROKER_WORKER_SLEEP_TIME = float(os.environ['message_broker_worker_sleep_time'])
+MESSAGE_BROKER_WINDOW_SIZE = int(os.getenv("message_broker_window_size", "500"))
 
 # OIDC
 CLIENT_ID = os.environ['client_id']
@@ -3,17 +3,29 @@
 from __future__ import annotations
 
 from datetime import datetime
+import hashlib
+import hmac
 import secrets
 import re
+import threading
+import time
 
 from passlib.hash import pbkdf2_sha256
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import select
 
+from OpenPostbud import config
 from OpenPostbud.database.base import Base
 from OpenPostbud.database import connection
 
 
+# Api keys that passed verification, keyed by a digest of the key.
+# The digest key is random per process so the cache can't be used to guess keys.
+_DIGEST_KEY = secrets.token_bytes(32)
+_verified_keys: dict[str, tuple[str, str, float]] = {}
+_verified_keys_lock = threading.Lock()
+
+
 class ApiUser(Base):
     """An ORM class representing an api user."""
     __tablename__ = "ApiUsers"
@@ -74,12 +86,15 @@ def delete_api_user(user_id: str):
         if user:
             session.delete(user)
             session.commit()
+            _forget_verified_keys(user_id)
             return True
         return False
 
 
 def verify_api_key(api_key: str) -> ApiUser | None:
     """Verify an api key against the database.
+    Keys that were verified within api_key_cache_seconds skip the slow hash verification
+    as long as the user is still active and its key hash is unchanged.
 
     Args:
         api_key: The api key to verify
@@ -96,10 +111,32 @@ def verify_api_key(api_key: str) -> ApiUser | None:
     with connection.get_session() as session:
         user = session.get(ApiUser, id)
 
-    if user and user.active and pbkdf2_sha256.verify(key, user.key_hash):
+    if not user or not user.active:
+        return None
+
+    digest = hmac.new(_DIGEST_KEY, api_key.encode(), hashlib.sha256).hexdigest()
+
+    with _verified_keys_lock:
+        cached = _verified_keys.get(digest)
+
+    if cached and cached[:2] == (user.id, user.key_hash) and cached[2] > time.monotonic():
         return user
 
-    return None
+    if not pbkdf2_sha256.verify(key, user.key_hash):
+        return None
+
+    if config.API_KEY_CACHE_SECONDS > 0:
+        with _verified_keys_lock:
+            _verified_keys[digest] = (user.id, user.key_hash, time.monotonic() + config.API_KEY_CACHE_SECONDS)
+
+    return user
+
+
+def _forget_verified_keys(user_id: str):
+    """Remove all cached verifications of the given user's api keys."""
+    with _verified_keys_lock:
+        for digest in [d for d, cached in _verified_keys.items() if cached[0] == user_id]:
+            del _verified_keys[digest]
 
 
 if __name__ == "__main__":
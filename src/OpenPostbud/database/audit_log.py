@@ -2,6 +2,7 @@
 
 from datetime import datetime
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Mapped, mapped_column
 
 from OpenPostbud.database.base import Base
@@ -33,3 +34,16 @@ def add_log(user: str, path: str):
     with connection.get_session() as session:
         session.add(log)
         session.commit()
+
+
+def add_logs(logs: list[tuple[datetime, str, str]]):
+    """Add multiple logs to the audit log in a single insert.
+
+    Args:
+        logs: A list of tuples of the time of the request, the user and the requested path.
+    """
+    log_dicts = [{"timestamp": timestamp, "user": user, "path": path} for timestamp, user, path in logs]
+
+    with connection.get_session() as session:
+        session.execute(insert(AuditLog), log_dicts)
+        session.commit()
@@ -0,0 +1,96 @@
+"""This module contains the RegistrationCache ORM class used to cache
+registration lookups across workers.
+"""
+
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy import String, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Mapped, mapped_column
+
+from OpenPostbud import config
+from OpenPostbud.database.base import Base
+from OpenPostbud.database import connection
+from OpenPostbud.database.check_registration.registration_job import JobType
+from OpenPostbud.database.data_types.blind_index import blind_index
+
+
+class RegistrationCache(Base):
+    """An ORM class representing a cached registration lookup.
+    The recipient is only stored as a blind index of the recipient id and
+    registration type.
+    """
+    __tablename__ = "RegistrationCache"
+
+    lookup_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    registration_type: Mapped[JobType]
+    registered: Mapped[bool]
+    checked_at: Mapped[datetime] = mapped_column(default=datetime.now)
+
+
+def _get_lookup_key(recipient_id: str, registration_type: JobType) -> str:
+    """Get the cache key of the given recipient and registration type."""
+    return blind_index(f"{registration_type.value}:{recipient_id}")
+
+
+def get_cached_registration(recipient_id: str, registration_type: JobType) -> bool | None:
+    """Get a cached registration lookup if it hasn't expired.
+
+    Args:
+        recipient_id: The CPR or CVR number of the recipient.
+        registration_type: The type of registration.
+
+    Returns:
+        Whether the recipient is registered or None if no valid cached lookup exists.
+    """
+    with connection.get_session() as session:
+        cached = session.get(RegistrationCache, _get_lookup_key(recipient_id, registration_type))
+
+    if cached and cached.checked_at > datetime.now() - timedelta(seconds=config.REGISTRATION_CACHE_SECONDS):
+        return cached.registered
+
+    return None
+
+
+def cache_registration(recipient_id: str, registration_type: JobType, registered: bool):
+    """Add or update a registration lookup in the cache.
+    The row is upserted in a single statement so concurrent workers
+    caching the same recipient don't conflict.
+
+    Args:
+        recipient_id: The CPR or CVR number of the recipient.
+        registration_type: The type of registration.
+        registered: Whether the recipient is registered.
+    """
+    dialect_insert = postgresql.insert if connection.get_connection_engine().dialect.name == "postgresql" else sqlite.insert
+
+    query = dialect_insert(RegistrationCache).values(
+        lookup_key=_get_lookup_key(recipient_id, registration_type),
+        registration_type=registration_type,
+        registered=registered,
+        checked_at=datetime.now()
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[RegistrationCache.lookup_key],
+        set_={
+            "registered": query.excluded.registered,
+            "checked_at": query.excluded.checked_at
+        }
+    )
+
+    with connection.get_session() as session:
+        session.execute(query)
+        session.commit()
+
+
+def delete_expired_registrations():
+    """Delete cached registration lookups that are older than REGISTRATION_CACHE_SECONDS."""
+    logging.info("Cleaning up expired registration cache.")
+
+    with connection.get_session() as session:
+        query = delete(RegistrationCache).where(datetime.now() - timedelta(seconds=config.REGISTRATION_CACHE_SECONDS) > RegistrationCache.checked_at)
+        count = session.execute(query).rowcount
+        session.commit()
+
+    logging.info(f"Deleted {count} expired cached registrations.")
@@ -1,15 +1,17 @@
 """This module contains ORM classes representing registration tasks."""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 
-from sqlalchemy import ForeignKey, insert, select, String
+from sqlalchemy import ForeignKey, Index, insert, select, String, update
 from sqlalchemy.orm import Mapped, mapped_column
 
 from OpenPostbud.database.base import Base
 from OpenPostbud.database import connection
+from OpenPostbud.database.data_types.blind_index import blind_index
 from OpenPostbud.database.data_types.encrypted_string import EncryptedString
 from OpenPostbud.database.data_types.id_generator import create_id
+from OpenPostbud.utils import worker_signal
 
 
 class TaskStatus(Enum):
@@ -25,10 +27,16 @@ class RegistrationTask(Base):
     A registration task corresponds to a single lookup of a person.
     """
     __tablename__ = "RegistrationTasks"
+    __table_args__ = (
+        Index("ix_RegistrationTasks_status", "status"),
+        Index("ix_RegistrationTasks_job_id_status", "job_id", "status"),
+        Index("ix_RegistrationTasks_registrant_index", "registrant_index"),
+    )
 
     id: Mapped[str] = mapped_column(String(12), primary_key=True, default=create_id("T-", 10))
     job_id: Mapped[int] = mapped_column(ForeignKey("RegistrationJobs.id", ondelete="CASCADE"))
     registrant_id: Mapped[str] = mapped_column(EncryptedString())
+    registrant_index: Mapped[str] = mapped_column(String(64), nullable=True)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.now)
     status: Mapped[TaskStatus] = mapped_column(default=TaskStatus.WAITING)
     result: Mapped[bool] = mapped_column(nullable=True)
@@ -52,6 +60,25 @@ def add_registration_tasks(job_id: int, registrant_list: list[str]):
         job_id: The job the tasks belong to.
         registrant_list: A list of CPR numbers.
     """
+    task_dicts = create_task_dicts(job_id, registrant_list)
+
+    with connection.get_session() as session:
+        session.execute(insert(RegistrationTask), task_dicts)
+        session.commit()
+
+    worker_signal.notify(worker_signal.Channel.REGISTRATION)
+
+
+def create_task_dicts(job_id: int, registrant_list: list[str]) -> list[dict[str, str]]:
+    """Create the values of new tasks to be inserted in the database.
+
+    Args:
+        job_id: The job the tasks belong to.
+        registrant_list: A list of CPR numbers.
+
+    Returns:
+        A list of dictionaries of task column values.
+    """
     task_dicts = []
 
     for registrant in registrant_list:
@@ -59,12 +86,11 @@ def add_registration_tasks(job_id: int, registrant_list: list[str]):
             {
                 "job_id": job_id,
                 "registrant_id": registrant,
+                "registrant_index": blind_index(registrant),
             }
         )
 
-    with connection.get_session() as session:
-        session.execute(insert(RegistrationTask), task_dicts)
-        session.commit()
+    return task_dicts
 
 
 def get_registration_tasks(job_id: int) -> tuple[RegistrationTask]:
@@ -73,3 +99,70 @@ def get_registration_tasks(job_id: int) -> tuple[RegistrationTask]:
         query = select(RegistrationTask).where(RegistrationTask.job_id == job_id)
         result = session.execute(query).scalars()
         return tuple(result)
+
+
+def get_registration_tasks_by_registrant(registrant_id: str) -> tuple[RegistrationTask]:
+    """Get all tasks checking the given registrant across all jobs.
+    The tasks are found using the registrant's blind index
+    so no rows are decrypted to search them.
+
+    Args:
+        registrant_id: The CPR number of the registrant.
+
+    Returns:
+        The tasks checking the registrant.
+    """
+    with connection.get_session() as session:
+        query = select(RegistrationTask).where(RegistrationTask.registrant_index == blind_index(registrant_id))
+        result = session.execute(query).scalars()
+        return tuple(result)
+
+
+def get_registration_result(job_id: str, registrant_id: str) -> bool | None:
+    """Get the result of a finished lookup of the registrant in the given job.
+    The task is found using the registrant's blind index.
+
+    Args:
+        job_id: The id of the registration job.
+        registrant_id: The CPR or CVR number of the registrant.
+
+    Returns:
+        Whether the registrant is registered or None if the job has no checked task for the registrant.
+    """
+    with connection.get_session() as session:
+        query = (
+            select(RegistrationTask.result)
+            .where(
+                RegistrationTask.job_id == job_id,
+                RegistrationTask.registrant_index == blind_index(registrant_id),
+                RegistrationTask.status == TaskStatus.CHECKED
+            )
+            .limit(1)
+        )
+        return session.execute(query).scalar()
+
+
+def reset_stale_tasks(timeout_seconds: int) -> int:
+    """Set the status of tasks that have been 'checking' for longer than
+    the timeout back to 'waiting'. This happens if a registration worker
+    stopped while checking them.
+
+    Args:
+        timeout_seconds: The number of seconds after which a checking task is considered stale.
+
+    Returns:
+        The number of tasks reset.
+    """
+    with connection.get_session() as session:
+        q = (
+            update(RegistrationTask)
+            .where(
+                RegistrationTask.status == TaskStatus.CHECKING,
+                RegistrationTask.updated_at < datetime.now() - timedelta(seconds=timeout_seconds)
+            )
+            .values(status=TaskStatus.WAITING, updated_at=datetime.now())
+        )
+        count = session.execute(q).rowcount
+        session.commit()
+
+    return count
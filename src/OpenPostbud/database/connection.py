@@ -1,14 +1,18 @@
 """This module contains common static functions to interact with the database."""
 
 from functools import lru_cache
+import sqlite3
 
-from sqlalchemy import Engine, create_engine, event
+from sqlalchemy import Engine, create_engine, event, make_url
 from sqlalchemy.orm import Session
 
+from OpenPostbud import config
 from OpenPostbud.database import base
 
 
-DATABASE_PATH = "database.db"
+DATABASE_URL = make_url(config.DATABASE_URL)
+# The path of the database file when using SQLite
+DATABASE_PATH = DATABASE_URL.database if DATABASE_URL.get_backend_name() == "sqlite" else None
 
 
 def get_session() -> Session:
@@ -24,13 +28,23 @@ def create_tables():
 @lru_cache(maxsize=1)
 def get_connection_engine() -> Engine:
     """Connect to the database."""
-    return create_engine(f"sqlite+pysqlite:///{DATABASE_PATH}")
+    return create_engine(DATABASE_URL)
 
 
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, _):
     """An eventlistener that will set PRAGMA
     options on every new connection to the database.
+    WAL journaling lets readers continue while a worker is writing.
+    Connections to other databases than SQLite are left untouched.
     """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
     dbapi_connection.execute("PRAGMA foreign_keys=ON")
+    dbapi_connection.execute(f"PRAGMA journal_mode={config.DATABASE_JOURNAL_MODE}")
+    dbapi_connection.execute(f"PRAGMA synchronous={config.DATABASE_SYNCHRONOUS}")
+    dbapi_connection.execute(f"PRAGMA busy_timeout={config.DATABASE_BUSY_TIMEOUT_MS}")
+    dbapi_connection.execute(f"PRAGMA mmap_size={config.DATABASE_MMAP_SIZE_MB * 1024 * 1024}")
+    dbapi_connection.execute(f"PRAGMA cache_size={config.DATABASE_CACHE_SIZE}")
     dbapi_connection.commit()
@@ -0,0 +1,25 @@
+"""This module contains functions for creating blind indexes of encrypted values.
+A blind index is a keyed hash of a value which makes it possible to look up
+encrypted columns without decrypting them.
+"""
+
+import hashlib
+import hmac
+
+from OpenPostbud import config
+
+
+# Derive a separate key so the storage secret itself is never used for hashing
+INDEX_KEY = hmac.new(config.DATABASE_STORAGE_SECRET.encode(), b"OpenPostbud blind index", hashlib.sha256).digest()
+
+
+def blind_index(value: str) -> str:
+    """Create a blind index of the given value.
+
+    Args:
+        value: The value to index.
+
+    Returns:
+        The blind index as a hex string.
+    """
+    return hmac.new(INDEX_KEY, value.encode(), hashlib.sha256).hexdigest()
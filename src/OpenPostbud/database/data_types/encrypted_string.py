@@ -1,6 +1,7 @@
 """This module contains a type decorator class for use in ORM models."""
 
 from sqlalchemy import Dialect, types
+from sqlalchemy.dialects import postgresql
 from cryptography.fernet import Fernet
 
 from OpenPostbud import config
@@ -16,7 +17,13 @@ class EncryptedString(types.TypeDecorator):
     going to and from the database.
     """
     impl = types.BINARY
-    cache_ok = False
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> types.TypeEngine:
+        """Use BYTEA on PostgreSQL which doesn't have a BINARY type."""
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.BYTEA())
+        return dialect.type_descriptor(self.impl_instance)
 
     # pylint: disable=unused-argument
     def process_bind_param(self, value: str, dialect: Dialect) -> bytes:
@@ -27,3 +34,4 @@ class EncryptedString(types.TypeDecorator):
     def process_result_value(self, value: bytes, dialect: Dialect) -> str:
         """Decrypt the value when retrieving from the database."""
         return CIPHER.decrypt(value).decode()
+
@@ -2,11 +2,18 @@
 The purpose of this module is to avoid circular imports.
 """
 
-from sqlalchemy import select, func
+from sqlalchemy import insert, select, func, update
 
 from OpenPostbud.database import connection
-from OpenPostbud.database.digital_post.letters import Letter
+from OpenPostbud.database.check_registration import registration_task
+from OpenPostbud.database.check_registration.registration_job import JobType, RegistrationJob
+from OpenPostbud.database.check_registration.registration_task import RegistrationTask, TaskStatus
+from OpenPostbud.database.data_types.blind_index import blind_index
+from OpenPostbud.database.digital_post import letters
+from OpenPostbud.database.digital_post.letters import Letter, MemoFields
+from OpenPostbud.database.digital_post.shipments import Shipment
 from OpenPostbud.database.nemsms.nemsms_messages import NemSMSMessage
+from OpenPostbud.utils import worker_signal
 
 
 def calculate_shipment_status(shipment_id: str) -> list[tuple[str, int]]:
@@ -49,3 +56,104 @@ def calculate_nemsms_shipment_status(shipment_id: str) -> list[tuple[str, int]]:
         statuses = list((r[0].value, r[1]) for r in result)
         statuses.sort()
         return statuses
+
+
+def add_letters_with_registration_job(shipment_id: str, csv_data: list[dict[str, str]]) -> str:
+    """Add letters to the shipment together with a registration job checking the
+    Digital Post registration of all recipients. The job is linked to the shipment so the
+    shipment worker waits for it to finish before sending.
+    Everything is added in a single transaction so the letters can't be claimed before the job exists.
+
+    Args:
+        shipment_id: The id of the shipment.
+        csv_data: A list of dictionaries containing merge data.
+
+    Returns:
+        The id of the new registration job.
+    """
+    # Read the recipients before the letter dicts remove them from the csv data
+    # Each recipient only needs to be checked once
+    recipients = list(dict.fromkeys(line[MemoFields.MEMO_MODTAGER.key] for line in csv_data))
+
+    with connection.get_session() as session:
+        shipment = session.get(Shipment, shipment_id)
+
+        job = RegistrationJob(
+            name=f"Forsendelse {shipment_id}",
+            description=f"Tilmeldingstjek for forsendelsen '{shipment.name}'",
+            job_type=JobType.DIGITAL_POST,
+            created_by=shipment.created_by
+        )
+        session.add(job)
+        session.flush()
+
+        session.execute(insert(RegistrationTask), registration_task.create_task_dicts(job.id, recipients))
+        session.execute(update(Shipment).where(Shipment.id == shipment_id).values(registration_job_id=job.id))
+        session.execute(insert(Letter), letters.create_letter_dicts(shipment_id, csv_data))
+        session.commit()
+        job_id = job.id
+
+    worker_signal.notify(worker_signal.Channel.REGISTRATION)
+    letters.notify_letters_added()
+
+    return job_id
+
+
+def calculate_registration_job_status(job_id: str) -> list[tuple[str, int]]:
+    """Get the number of tasks in the registration job grouped by their status and result.
+    Failed lookups are counted separately from pending ones.
+
+    Args:
+        job_id: The id of the registration job.
+
+    Returns:
+        A list of tuples of (Result text, count). Sorted by result text.
+    """
+    with connection.get_session() as session:
+        query = (
+            select(RegistrationTask.status, RegistrationTask.result, func.count(RegistrationTask.id))  # pylint: disable=not-callable
+            .where(RegistrationTask.job_id == job_id)
+            .group_by(RegistrationTask.status, RegistrationTask.result)
+        )
+        result = session.execute(query)
+
+        counts: dict[str, int] = {}
+        for status, registered, count in result:
+            if status == TaskStatus.FAILED:
+                text = "Fejlet"
+            elif status == TaskStatus.CHECKED:
+                text = "Tilmeldt" if registered else "Ikke tilmeldt"
+            else:
+                text = "Afventer"
+            counts[text] = counts.get(text, 0) + count
+
+        return sorted(counts.items())
+
+
+def backfill_blind_indexes(batch_size: int = 1000):
+    """Add blind indexes to letters, NemSMS messages and registration tasks
+    created before the blind index columns existed.
+
+    Args:
+        batch_size: The number of rows to update per transaction.
+    """
+    columns = (
+        (Letter, Letter.recipient_id, Letter.recipient_index),
+        (NemSMSMessage, NemSMSMessage.recipient_id, NemSMSMessage.recipient_index),
+        (RegistrationTask, RegistrationTask.registrant_id, RegistrationTask.registrant_index)
+    )
+
+    for model, value_column, index_column in columns:
+        count = 0
+        while True:
+            with connection.get_session() as session:
+                query = select(model.id, value_column).where(index_column.is_(None)).limit(batch_size)
+                rows = session.execute(query).all()
+                if not rows:
+                    break
+
+                session.execute(update(model), [{"id": id, index_column.key: blind_index(value)} for id, value in rows])
+                session.commit()
+                count += len(rows)
+
+        print(f"Added blind indexes to {count} rows in '{model.__tablename__}'")
@@ -3,21 +3,24 @@
 from __future__ import annotations
 
 from datetime import datetime
+import hashlib
 import json
 from enum import Enum
 import re
 
-from sqlalchemy import ForeignKey, insert, select, String, update
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Index, insert, select, String, update
+from sqlalchemy.orm import Mapped, defer, mapped_column
 
+from OpenPostbud import config
 from OpenPostbud.database.base import Base
 from OpenPostbud.database import connection
+from OpenPostbud.database.data_types.blind_index import blind_index
 from OpenPostbud.database.data_types.encrypted_string import EncryptedString
 from OpenPostbud.database.data_types.id_generator import create_id
 from OpenPostbud.database.common import ShipmentStatus, PostType
 from OpenPostbud.database.digital_post import templates
 from OpenPostbud.database import document_storage
-from OpenPostbud.utils import docx_util
+from OpenPostbud.utils import docx_util, worker_signal
 
 
 class MemoFields(Enum):
@@ -51,19 +54,37 @@ class MemoFields(Enum):
         return self.mandatory_digital or self.mandatory_physical
 
 
+class RenderStatus(Enum):
+    """An enum denoting whether a letter's pdf has been rendered
+    to the document storage ahead of sending.
+    """
+    WAITING = "waiting"
+    RENDERING = "rendering"
+    RENDERED = "rendered"
+    FAILED = "failed"
+
+
 class Letter(Base):
     """An ORM class representing a letter."""
     __tablename__ = "Letters"
+    __table_args__ = (
+        Index("ix_Letters_status_updated_at", "status", "updated_at"),
+        Index("ix_Letters_shipment_id_status", "shipment_id", "status"),
+        Index("ix_Letters_transaction_id", "transaction_id"),
+        Index("ix_Letters_recipient_index", "recipient_index"),
+    )
 
     id: Mapped[str] = mapped_column(String(12), primary_key=True, default=create_id("L-", 10))
     shipment_id: Mapped[str] = mapped_column(ForeignKey("Shipments.id", ondelete="CASCADE"))
     recipient_id: Mapped[str] = mapped_column(EncryptedString())
+    recipient_index: Mapped[str] = mapped_column(String(64), nullable=True)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.now)
     status: Mapped[ShipmentStatus] = mapped_column(default=ShipmentStatus.WAITING)
     message: Mapped[str] = mapped_column(String(100), nullable=True)
     field_data: Mapped[str] = mapped_column(EncryptedString())
     transaction_id: Mapped[str] = mapped_column(nullable=True)
     sent_as: Mapped[PostType] = mapped_column(nullable=True)
+    render_status: Mapped[RenderStatus] = mapped_column(default=RenderStatus.WAITING)
 
     def to_row_dict(self) -> dict[str, str]:
         """Convert to a dictionary to be shown in a table."""
@@ -79,24 +100,49 @@ class Letter(Base):
     def merge_letter(self) -> bytes:
         """Merge the letter's merge field data with its template
         and convert to pdf.
+        The result is stored in the document storage and shared between
+        letters with the same render hash.
 
         Returns:
             The merged pdf letter as bytes.
         """
-        stored_file = document_storage.get_letter_doc(self.shipment_id, self.id)
+        template = templates.get_template_by_shipment(self.shipment_id)
+
+        if not template.file_name.endswith(".docx"):
+            return template.file_data
+
+        render_hash = self.get_render_hash()
+        stored_file = document_storage.get_rendered_doc(self.shipment_id, render_hash)
         if stored_file:
             return stored_file
 
-        template = templates.get_template_by_shipment(self.shipment_id)
+        word_file = self.merge_word_file(template)
+        pdf_file = docx_util.convert_word_to_pdf(word_file)
+        document_storage.save_rendered_doc(self.shipment_id, render_hash, pdf_file)
+        return pdf_file
 
-        if template.file_name.endswith(".docx"):
-            field_data = json.loads(self.field_data)
-            word_file = docx_util.merge_word_file(template.file_data, field_data)
-            pdf_file = docx_util.convert_word_to_pdf(word_file)
-            document_storage.save_letter_doc(self.shipment_id, self.id, pdf_file)
-            return pdf_file
+    def get_render_hash(self) -> str:
+        """Get a hash identifying the rendered content of the letter.
+        Letters with the same template and merge field data have the same hash.
 
-        return template.file_data
+        Returns:
+            The render hash as a hex string.
+        """
+        template_id = templates.get_template_by_shipment(self.shipment_id).id
+        canonical_data = json.dumps(json.loads(self.field_data), sort_keys=True)
+        return hashlib.sha256(f"{template_id}:{canonical_data}".encode()).hexdigest()
+
+    def merge_word_file(self, template: templates.Template) -> bytes:
+        """Merge the letter's merge field data with the given Word template.
+
+        Args:
+            template: The letter's docx template.
+
+        Returns:
+            The merged Word file as bytes.
+        """
+        field_data = json.loads(self.field_data)
+        return docx_util.merge_word_file(template.file_data, field_data)
 
     def set_status(self, status: ShipmentStatus, transaction_id: str | None = None, message: str | None = None, sent_as: PostType | None = None):
         """Set the status of the letter in the database.
@@ -127,6 +173,42 @@ class Letter(Base):
             session.commit()
 
 
+def set_render_status(letter_ids: list[str], render_status: RenderStatus):
+    """Set the render status of multiple letters in the database.
+
+    Args:
+        letter_ids: The ids of the letters to update.
+        render_status: The render status to set on the letters.
+    """
+    with connection.get_session() as session:
+        q = (
+            update(Letter)
+            .where(Letter.id.in_(letter_ids))
+            .values(render_status=render_status)
+        )
+        session.execute(q)
+        session.commit()
+
+
+def reset_rendering_letters() -> int:
+    """Set the render status of letters left as 'rendering' back to 'waiting'.
+    This happens if the render worker stopped while rendering them.
+
+    Returns:
+        The number of letters reset.
+    """
+    with connection.get_session() as session:
+        q = (
+            update(Letter)
+            .where(Letter.render_status == RenderStatus.RENDERING)
+            .values(render_status=RenderStatus.WAITING)
+        )
+        count = session.execute(q).rowcount
+        session.commit()
+
+    return count
+
+
 def add_letters(shipment_id: str, csv_data: list[dict[str, str]]):
     """Add multiple new letters to the database based
     on a csv file containing letter merge data.
@@ -135,6 +217,26 @@ def add_letters(shipment_id: str, csv_data: list[dict[str, str]]):
         shipment_id: The id of the shipment the letters belong to.
         csv_data: A list of dictionaries containing merge data.
     """
+    letter_dicts = create_letter_dicts(shipment_id, csv_data)
+
+    with connection.get_session() as session:
+        session.execute(insert(Letter), letter_dicts)
+        session.commit()
+
+    notify_letters_added()
+
+
+def create_letter_dicts(shipment_id: str, csv_data: list[dict[str, str]]) -> list[dict[str, str]]:
+    """Create the values of new letters to be inserted in the database.
+    The recipient is removed from each line of the csv data.
+
+    Args:
+        shipment_id: The id of the shipment the letters belong to.
+        csv_data: A list of dictionaries containing merge data.
+
+    Returns:
+        A list of dictionaries of letter column values.
+    """
     letter_dicts = []
 
     for line in csv_data:
@@ -144,19 +246,53 @@ def add_letters(shipment_id: str, csv_data: list[dict[str, str]]):
             {
                 "shipment_id": shipment_id,
                 "recipient_id": recipient,
+                "recipient_index": blind_index(recipient),
                 "field_data": json.dumps(line)
             }
         )
 
-    with connection.get_session() as session:
-        session.execute(insert(Letter), letter_dicts)
-        session.commit()
+    return letter_dicts
+
+
+def notify_letters_added():
+    """Wake up the workers handling new letters."""
+    worker_signal.notify(worker_signal.Channel.RENDER)
+    worker_signal.notify(worker_signal.Channel.SHIPMENT, delay=config.SHIPMENT_WORKER_DELAY)
 
 
 def get_letters(shipment_id: str) -> tuple[Letter]:
-    """Get all letters belonging to a shipment."""
+    """Get all letters belonging to a shipment.
+    The letters' field data is neither loaded nor decrypted and
+    accessing it raises an error. Get the letter by id to access it.
+    """
+    with connection.get_session() as session:
+        query = (
+            select(Letter)
+            .where(Letter.shipment_id == shipment_id)
+            .options(defer(Letter.field_data, raiseload=True))
+        )
+        result = session.execute(query).scalars()
+        return tuple(result)
+
+
+def get_letters_by_recipient(recipient_id: str) -> tuple[Letter]:
+    """Get all letters sent to the given recipient across all shipments.
+    The letters are found using the recipient's blind index
+    so no rows are decrypted to search them.
+    The letters' field data is not loaded.
+
+    Args:
+        recipient_id: The CPR or CVR number of the recipient.
+
+    Returns:
+        The letters sent to the recipient.
+    """
     with connection.get_session() as session:
-        query = select(Letter).where(Letter.shipment_id == shipment_id)
+        query = (
+            select(Letter)
+            .where(Letter.recipient_index == blind_index(recipient_id))
+            .options(defer(Letter.field_data, raiseload=True))
+        )
         result = session.execute(query).scalars()
         return tuple(result)
 
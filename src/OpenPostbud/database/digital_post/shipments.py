@@ -25,6 +25,7 @@ class Shipment(Base):
     created_at: Mapped[datetime] = mapped_column(default=datetime.now)
     created_by: Mapped[str] = mapped_column(String(50))
     post_type: Mapped[PostType] = mapped_column(default=PostType.DIGITAL)
+    registration_job_id: Mapped[str] = mapped_column(ForeignKey("RegistrationJobs.id", ondelete="SET NULL"), nullable=True)
 
     def to_row_dict(self):
         """Convert to a dictionary to be shown in a table."""
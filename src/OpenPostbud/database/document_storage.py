@@ -5,6 +5,7 @@ the document storage.
 
 from pathlib import Path
 import shutil
+import uuid
 from dataclasses import dataclass
 
 
@@ -52,33 +53,52 @@ def delete_shipment_docs(shipment_id: str):
         shutil.rmtree(folder_path)
 
 
-def _get_letter_path(shipment_id: str, letter_id: str) -> Path:
-    """Get the path to the letter's doc file."""
-    folder_path = _get_shipment_folder(shipment_id)
-    return (folder_path / letter_id).with_suffix(LETTER_SUFFIX)
+def _get_rendered_doc_path(shipment_id: str, render_hash: str) -> Path:
+    """Get the path to a rendered document in the shipment's folder."""
+    folder_path = _get_shipment_folder(shipment_id) / "rendered"
+    return (folder_path / render_hash).with_suffix(LETTER_SUFFIX)
 
 
-def save_letter_doc(shipment_id: str, letter_id: str, doc_bytes: bytes):
-    """Save a letter's document to the document storage.
+def save_rendered_doc(shipment_id: str, render_hash: str, doc_bytes: bytes):
+    """Save a rendered letter document to the document storage.
+    The document is stored by its render hash so letters with identical
+    content share a single file.
     It's assumed the document is a pdf file.
     """
-    letter_path = _get_letter_path(shipment_id, letter_id)
-    letter_path.parent.mkdir(parents=True, exist_ok=True)
-    letter_path.write_bytes(doc_bytes)
+    doc_path = _get_rendered_doc_path(shipment_id, render_hash)
+    doc_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first so other processes never read a partial file
+    temp_path = doc_path.with_suffix(f".{uuid.uuid4()}.tmp")
+    temp_path.write_bytes(doc_bytes)
+    temp_path.replace(doc_path)
 
 
-def get_letter_doc(shipment_id: str, letter_id: str) -> bytes | None:
-    """Get a letter's document from the document storage
+def get_rendered_doc(shipment_id: str, render_hash: str) -> bytes | None:
+    """Get a rendered letter document from the document storage
     if it exists.
     """
-    letter_path = _get_letter_path(shipment_id, letter_id)
+    doc_path = _get_rendered_doc_path(shipment_id, render_hash)
 
     try:
-        return letter_path.read_bytes()
+        return doc_path.read_bytes()
     except FileNotFoundError:
         return None
 
 
+def get_rendered_doc_file(shipment_id: str, render_hash: str) -> Path | None:
+    """Get the path to a rendered letter document in the document storage
+    if it exists. Use this to stream the document instead of reading it into memory.
+    """
+    doc_path = _get_rendered_doc_path(shipment_id, render_hash)
+    return doc_path if doc_path.is_file() else None
+
+
+def rendered_doc_exists(shipment_id: str, render_hash: str) -> bool:
+    """Check if a rendered letter document exists in the document storage."""
+    return _get_rendered_doc_path(shipment_id, render_hash).is_file()
+
+
 def _get_attachments_folder(shipment_id: str) -> Path:
     """Get the attachments folder for the given shipment."""
     return _get_shipment_folder(shipment_id) / "attachments"
@@ -122,13 +142,20 @@ def list_attachments(shipment_id: str) -> list[tuple[str, int]]:
 
 def get_attachment(shipment_id: str, index: int) -> Attachment:
     """Get the attachment file with the given index for the shipment."""
+    file_path = get_attachment_file(shipment_id, index)
+    return Attachment(file_path.name, file_path.read_bytes(), ATTACHMENT_FILE_TYPES[file_path.suffix.lower()])
+
+
+def get_attachment_file(shipment_id: str, index: int) -> Path:
+    """Get the path to the attachment file with the given index for the shipment.
+    Use this to stream the attachment instead of reading it into memory.
+    """
     folder = _get_attachments_folder(shipment_id) / str(index)
 
     if not folder.is_dir():
         raise ValueError(f"No attachment with index {index} exists for shipment {shipment_id}.")
 
-    file_path = next(folder.iterdir())
-    return Attachment(file_path.name, file_path.read_bytes(), ATTACHMENT_FILE_TYPES[file_path.suffix.lower()])
+    return next(folder.iterdir())
 
 
 def add_attachments(shipment_id: str, attachments: list[Attachment]):
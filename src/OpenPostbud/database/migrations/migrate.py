@@ -4,10 +4,12 @@ import hashlib
 from pathlib import Path
 import shutil
 
-from OpenPostbud.database import connection
+from sqlalchemy import text
 
+from OpenPostbud.database import connection, base
 
-MIGRATIONS_FOLDER = Path("src/OpenPostbud/database/migrations/sql")
+
+MIGRATIONS_FOLDER = Path(__file__).parent / "sql"
 
 
 def perform_step(file_path: Path):
@@ -17,7 +19,7 @@ def perform_step(file_path: Path):
         name = file_path.stem
         checksum = hashlib.sha1(sql.encode()).hexdigest()
 
-        row = conn.exec_driver_sql("SELECT checksum FROM schema_migrations WHERE name=:n", {"n": name}).fetchone()
+        row = conn.execute(text("SELECT checksum FROM schema_migrations WHERE name=:n"), {"n": name}).fetchone()
         if row:
             if row[0] != checksum:
                 raise RuntimeError(f"Checksum has changed for step '{name}'")
@@ -27,17 +29,39 @@ def perform_step(file_path: Path):
         for statement in sql.split("\n\n\n"):
             conn.exec_driver_sql(statement)
 
-        conn.exec_driver_sql("INSERT INTO schema_migrations (name, checksum) VALUES (:n, :c)", {"n": name, "c": checksum})
+        conn.execute(text("INSERT INTO schema_migrations (name, checksum) VALUES (:n, :c)"), {"n": name, "c": checksum})
         print(f"Applied step '{name}'")
 
 
+def create_baseline():
+    """Create the tables of a new database directly from the ORM models
+    and mark all existing migration steps as applied.
+    This is used for databases other than SQLite since the existing
+    migration files are written in SQLite's dialect.
+    """
+    engine = connection.get_connection_engine()
+
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar():
+            return
+
+    base.create_tables(engine)
+
+    with engine.begin() as conn:
+        for file_path in sorted(MIGRATIONS_FOLDER.iterdir()):
+            checksum = hashlib.sha1(file_path.read_text().encode()).hexdigest()
+            conn.execute(text("INSERT INTO schema_migrations (name, checksum) VALUES (:n, :c)"), {"n": file_path.stem, "c": checksum})
+
+    print("Created database from the ORM models")
+
+
 def create_migrations_table():
     """Create a table in the database to track migrations."""
     with connection.get_connection_engine().begin() as conn:
         conn.exec_driver_sql(
             """CREATE TABLE IF NOT EXISTS schema_migrations (
                 name TEXT PRIMARY KEY,
-                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 checksum TEXT
             );"""
         )
@@ -45,11 +69,18 @@ def create_migrations_table():
 
 def perform_migrations():
     """Perform all sql migrations in the migrations folder."""
-    if Path(connection.DATABASE_PATH).exists():
+    if connection.DATABASE_PATH and Path(connection.DATABASE_PATH).exists():
+        # Move all changes from the write-ahead log into the database file before copying it
+        with connection.get_connection_engine().begin() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
         backup_path = Path(connection.DATABASE_PATH).with_suffix(".backup")
         shutil.copyfile(connection.DATABASE_PATH, backup_path)
 
     create_migrations_table()
 
+    if connection.DATABASE_PATH is None:
+        create_baseline()
+
     for file in sorted(MIGRATIONS_FOLDER.iterdir()):
         perform_step(file)
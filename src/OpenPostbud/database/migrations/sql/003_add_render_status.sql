@@ -0,0 +1 @@
+ALTER TABLE "Letters" ADD COLUMN render_status VARCHAR(9) NOT NULL DEFAULT 'WAITING'
@@ -0,0 +1,7 @@
+CREATE TABLE "RegistrationCache" (
+	lookup_key VARCHAR(64) NOT NULL,
+	registration_type VARCHAR(12) NOT NULL,
+	registered BOOLEAN NOT NULL,
+	checked_at DATETIME NOT NULL,
+	PRIMARY KEY (lookup_key)
+)
@@ -0,0 +1 @@
+ALTER TABLE "Shipments" ADD COLUMN registration_job_id VARCHAR(12) REFERENCES "RegistrationJobs" (id) ON DELETE SET NULL
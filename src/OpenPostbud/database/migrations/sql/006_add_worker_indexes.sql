@@ -0,0 +1,16 @@
+CREATE INDEX "ix_Letters_status_updated_at" ON "Letters" (status, updated_at)
+
+
+CREATE INDEX "ix_Letters_shipment_id_status" ON "Letters" (shipment_id, status)
+
+
+CREATE INDEX "ix_NemSMS_Messages_status_updated_at" ON "NemSMS_Messages" (status, updated_at)
+
+
+CREATE INDEX "ix_NemSMS_Messages_shipment_id_status" ON "NemSMS_Messages" (shipment_id, status)
+
+
+CREATE INDEX "ix_RegistrationTasks_status" ON "RegistrationTasks" (status)
+
+
+CREATE INDEX "ix_RegistrationTasks_job_id_status" ON "RegistrationTasks" (job_id, status)
@@ -0,0 +1,4 @@
+CREATE INDEX "ix_Letters_transaction_id" ON "Letters" (transaction_id)
+
+
+CREATE INDEX "ix_NemSMS_Messages_transaction_id" ON "NemSMS_Messages" (transaction_id)
@@ -0,0 +1,16 @@
+ALTER TABLE "Letters" ADD COLUMN recipient_index VARCHAR(64)
+
+
+ALTER TABLE "NemSMS_Messages" ADD COLUMN recipient_index VARCHAR(64)
+
+
+ALTER TABLE "RegistrationTasks" ADD COLUMN registrant_index VARCHAR(64)
+
+
+CREATE INDEX "ix_Letters_recipient_index" ON "Letters" (recipient_index)
+
+
+CREATE INDEX "ix_NemSMS_Messages_recipient_index" ON "NemSMS_Messages" (recipient_index)
+
+
+CREATE INDEX "ix_RegistrationTasks_registrant_index" ON "RegistrationTasks" (registrant_index)
@@ -4,23 +4,33 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, insert, select, String, update
+from sqlalchemy import ForeignKey, Index, insert, select, String, update
 from sqlalchemy.orm import Mapped, mapped_column
 
+from OpenPostbud import config
 from OpenPostbud.database.base import Base
 from OpenPostbud.database import connection
+from OpenPostbud.database.data_types.blind_index import blind_index
 from OpenPostbud.database.data_types.encrypted_string import EncryptedString
 from OpenPostbud.database.data_types.id_generator import create_id
 from OpenPostbud.database.common import ShipmentStatus
+from OpenPostbud.utils import worker_signal
 
 
 class NemSMSMessage(Base):
     """An ORM class representing a NemSMS message."""
     __tablename__ = "NemSMS_Messages"
+    __table_args__ = (
+        Index("ix_NemSMS_Messages_status_updated_at", "status", "updated_at"),
+        Index("ix_NemSMS_Messages_shipment_id_status", "shipment_id", "status"),
+        Index("ix_NemSMS_Messages_transaction_id", "transaction_id"),
+        Index("ix_NemSMS_Messages_recipient_index", "recipient_index"),
+    )
 
     id: Mapped[str] = mapped_column(String(13), primary_key=True, default=create_id("NM-", 10))
     shipment_id: Mapped[str] = mapped_column(ForeignKey("NemSMS_Shipments.id", ondelete="CASCADE"))
     recipient_id: Mapped[str] = mapped_column(EncryptedString())
+    recipient_index: Mapped[str] = mapped_column(String(64), nullable=True)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.now)
     status: Mapped[ShipmentStatus] = mapped_column(default=ShipmentStatus.WAITING)
     status_message: Mapped[str] = mapped_column(String(100), nullable=True)
@@ -77,6 +87,7 @@ def add_messages(shipment_id: str, recipients: list[str]):
             {
                 "shipment_id": shipment_id,
                 "recipient_id": recipient,
+                "recipient_index": blind_index(recipient),
             }
         )
 
@@ -84,6 +95,8 @@ def add_messages(shipment_id: str, recipients: list[str]):
         session.execute(insert(NemSMSMessage), message_dicts)
         session.commit()
 
+    worker_signal.notify(worker_signal.Channel.NEMSMS, delay=config.SHIPMENT_WORKER_DELAY)
+
 
 def get_messages(shipment_id: str) -> tuple[NemSMSMessage]:
     """Get all messages belonging to a shipment."""
@@ -115,3 +128,20 @@ def abort_messages(shipment_id: str, user: str):
         )
         session.execute(query)
         session.commit()
+
+
+def get_messages_by_recipient(recipient_id: str) -> tuple[NemSMSMessage]:
+    """Get all messages sent to the given recipient across all shipments.
+    The messages are found using the recipient's blind index
+    so no rows are decrypted to search them.
+
+    Args:
+        recipient_id: The CPR number of the recipient.
+
+    Returns:
+        The messages sent to the recipient.
+    """
+    with connection.get_session() as session:
+        query = select(NemSMSMessage).where(NemSMSMessage.recipient_index == blind_index(recipient_id))
+        result = session.execute(query).scalars()
+        return tuple(result)
@@ -8,7 +8,7 @@ from OpenPostbud.routes.user.router import router as user_router
 from OpenPostbud.routes.api.router import router as api_router
 from OpenPostbud.routes.auth.router import router as auth_router
 from OpenPostbud.routes.admin.router import router as admin_router
-from OpenPostbud.middleware.audit_log import AuditMiddleware
+from OpenPostbud.middleware.audit_log import AuditMiddleware, audit_log_writer
 from OpenPostbud.middleware.authentication import AuthMiddleware
 
 
@@ -29,7 +29,9 @@ def main():
     app.include_router(api_router)
     app.include_router(admin_router)
     app.add_middleware(AuditMiddleware)
-    app.add_middleware(AuthMiddleware)
+    app.add_middleware(AuthMiddleware, user_prefix=user_router.prefix, admin_prefix=admin_router.prefix)
+    app.on_startup(audit_log_writer.start)
+    app.on_shutdown(audit_log_writer.stop)
 
     ui.run(
         title="OpenPostbud", favicon="📯",
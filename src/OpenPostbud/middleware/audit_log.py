@@ -1,24 +1,101 @@
 """This module contains middleware for the audit log."""
 
-from typing import Callable, Awaitable
+import asyncio
+from datetime import datetime
+import logging
 
-from fastapi import Request
 from nicegui import app
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from OpenPostbud import config
 from OpenPostbud.database import audit_log
 
 
-class AuditMiddleware(BaseHTTPMiddleware):
+class AuditLogWriter:
+    """Collects audit logs in memory and writes them to the database
+    in batches on a background task, so requests never wait on the database.
+    """
+    def __init__(self, queue_size: int, flush_seconds: float):
+        """
+        Args:
+            queue_size: The maximum number of logs kept in memory between flushes.
+            flush_seconds: The number of seconds between flushes.
+        """
+        self._queue: asyncio.Queue[tuple[datetime, str, str]] = asyncio.Queue(queue_size)
+        self._flush_seconds = flush_seconds
+        self._stopped = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def add_log(self, user: str, path: str):
+        """Queue a new log to be written on the next flush.
+        If the queue is full the log is dropped and an error is logged.
+
+        Args:
+            user: The user who visited the path.
+            path: The path that was requested.
+        """
+        try:
+            self._queue.put_nowait((datetime.now(), user, path))
+        except asyncio.QueueFull:
+            logging.error(f"Audit log queue is full. Dropped log of '{user}' visiting '{path}'")
+
+    async def start(self):
+        """Start flushing logs on a background task."""
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush all remaining logs."""
+        self._stopped.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+        # Logs may have been queued while the last flush of the task was running
+        while not self._queue.empty():
+            await self._flush()
+
+    async def _run(self):
+        """Flush the queue every flush interval until stopped."""
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self._flush_seconds)
+            except TimeoutError:
+                pass
+            await self._flush()
+
+    async def _flush(self):
+        """Write all queued logs to the database in a single insert."""
+        logs = []
+        while not self._queue.empty():
+            logs.append(self._queue.get_nowait())
+
+        if not logs:
+            return
+
+        try:
+            await asyncio.to_thread(audit_log.add_logs, logs)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.exception(f"Failed to write {len(logs)} audit logs")
+
+
+audit_log_writer = AuditLogWriter(config.AUDIT_LOG_QUEUE_SIZE, config.AUDIT_LOG_FLUSH_SECONDS)
+
+
+class AuditMiddleware:
     """This middleware adds a log every time a user tries to access a URL."""
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-        """The dispatch function fo the middleware.
-        Add the request path and the logged in user (if any) to the audit log.
+    def __init__(self, next_app: ASGIApp):
         """
+        Args:
+            next_app: The next app in the middleware stack.
+        """
+        self.next_app = next_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Add the request path and the logged in user (if any) to the audit log."""
         # Don't include internal resource paths
-        if not request.url.path.startswith("/_nicegui"):
-            audit_log.add_log(app.storage.user.get("user_id", "none"), request.url.path)
+        if scope["type"] == "http" and not scope["path"].startswith("/_nicegui"):
+            audit_log_writer.add_log(app.storage.user.get("user_id", "none"), scope["path"])
 
-        return await call_next(request)
+        await self.next_app(scope, receive, send)
@@ -1,15 +1,12 @@
 """This module handles authentication of users and contains middleware to check authentication."""
 
 from datetime import datetime, timedelta
-from typing import Callable, Awaitable
 import uuid
 from pathlib import Path
 
-from fastapi import Request, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 from nicegui import app, ui
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from OpenPostbud import config
 
@@ -105,26 +102,39 @@ def get_admin_token() -> str | None:
     return token
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
+class AuthMiddleware:
     """This middleware checks for authentication whenever a user
     tries to access a URL."""
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-        """The dispatch function fo the middleware.
-        Check if the request URL needs user authentication and if the user is authenticated.
-        Redirect to the login page if the user is not authenticated for the URL.
+    def __init__(self, next_app: ASGIApp, user_prefix: str, admin_prefix: str):
+        """
+        Args:
+            next_app: The next app in the middleware stack.
+            user_prefix: The path prefix of pages requiring an authenticated user.
+            admin_prefix: The path prefix of pages requiring admin access.
         """
-        # Import here to avoid circular imports
-        # pylint: disable=import-outside-toplevel,cyclic-import
-        from OpenPostbud.routes.user.router import router as user_router
-        from OpenPostbud.routes.admin.router import router as admin_router
+        self.next_app = next_app
+        self.user_prefix = user_prefix
+        self.admin_prefix = admin_prefix
 
-        if request.url.path.startswith(user_router.prefix) and not is_authenticated():
-            # Store the request path for later redirection
-            app.storage.user['referer_path'] = request.url.path
-            return RedirectResponse(app.url_path_for("Login"))
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Check if the request URL needs user authentication and if the user is authenticated.
+        Redirect to the login page if the user is not authenticated for the URL.
+        """
+        if scope["type"] != "http":
+            await self.next_app(scope, receive, send)
+            return
 
-        if request.url.path.startswith(admin_router.prefix) and not is_admin():
-            raise HTTPException(401, "Admin access denied.")
+        path = scope["path"]
 
-        return await call_next(request)
+        if path.startswith(self.user_prefix) and not is_authenticated():
+            # Store the request path for later redirection
+            app.storage.user['referer_path'] = path
+            response = RedirectResponse(app.url_path_for("Login"))
+        elif path.startswith(self.admin_prefix) and not is_admin():
+            response = JSONResponse({"detail": "Admin access denied."}, status_code=401)
+        else:
+            await self.next_app(scope, receive, send)
+            return
+
+        await response(scope, receive, send)
@@ -1,15 +1,20 @@
 """This module defines routes for the shipments api."""
 
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 import base64
+import hashlib
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, status
 from fastapi.exceptions import HTTPException
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, Field
 
 from OpenPostbud.database import connection, document_storage
 from OpenPostbud.database.digital_post import shipments as shipments_db
 from OpenPostbud.database.digital_post import letters as letters_db
+from OpenPostbud.database.digital_post import templates as templates_db
 
 
 router = APIRouter()
@@ -47,6 +52,13 @@ class AttachmentModel(BaseModel):
     file_data: str = Field(description="Base64-encoded file contents.")
 
 
+class AttachmentInfo(BaseModel):
+    """A pydantic model representing an attachment without its contents."""
+    index: int = Field(description="The index used to download the attachment.")
+    file_name: str
+    mime_type: str
+
+
 @router.get("/shipments", tags=["Shipments"])
 def get_shipments() -> list[ShipmentModel]:
     """Get all shipments and return as a list."""
@@ -98,6 +110,50 @@ def get_attachments(shipment_id: str) -> list[AttachmentModel]:
     return [AttachmentModel(file_name=a.name, file_data=base64.b64encode(a.data).decode()) for a in attachments]
 
 
+@router.get("/shipment/{shipment_id}/attachments/info", tags=["Shipments"])
+def get_attachment_info(shipment_id: str) -> list[AttachmentInfo]:
+    """Get the names and types of all attachments for the given shipment
+    without their contents."""
+    shipment = shipments_db.get_shipment(shipment_id)
+
+    if not shipment:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "No shipment exists with the given id")
+
+    attachments = sorted(document_storage.list_attachments(shipment_id), key=lambda a: a[1])
+    return [
+        AttachmentInfo(
+            index=index,
+            file_name=file_name,
+            mime_type=document_storage.ATTACHMENT_FILE_TYPES[Path(file_name).suffix.lower()]
+        )
+        for file_name, index in attachments
+    ]
+
+
+@router.get(
+    "/shipment/{shipment_id}/attachment/{index}",
+    tags=["Shipments"],
+    response_class=FileResponse,
+    responses={200: {"content": {"application/octet-stream": {}}}, 304: {"description": "Not modified"}}
+)
+def get_attachment_file(shipment_id: str, index: int, request: Request) -> Response:
+    """Get a single attachment file by its index.
+    Supports conditional requests and range requests."""
+    shipment = shipments_db.get_shipment(shipment_id)
+
+    if not shipment:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "No shipment exists with the given id")
+
+    try:
+        file_path = document_storage.get_attachment_file(shipment_id, index)
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "No attachment exists with the given index")  # pylint: disable=raise-missing-from
+
+    mime_type = document_storage.ATTACHMENT_FILE_TYPES[file_path.suffix.lower()]
+    response = FileResponse(file_path, media_type=mime_type, filename=file_path.name, stat_result=file_path.stat())
+    return _conditional_response(request, response)
+
+
 @router.get("/letter/{letter_id}", tags=["Letters"])
 def get_letter(letter_id: str) -> LetterDetail:
     """Get a letter by id. Merges and returns the final letter as a pdf
@@ -118,3 +174,77 @@ def get_letter(letter_id: str) -> LetterDetail:
         status=letter.status,
         letter_pdf=pdf_64
     )
+
+
+@router.get(
+    "/letter/{letter_id}/pdf",
+    tags=["Letters"],
+    response_class=FileResponse,
+    responses={200: {"content": {"application/pdf": {}}}, 304: {"description": "Not modified"}}
+)
+def get_letter_pdf(letter_id: str, request: Request) -> Response:
+    """Get the final letter as a pdf file.
+    The letter is merged first if it hasn't been rendered yet.
+    Supports conditional requests using ETag and range requests."""
+    with connection.get_session() as session:
+        letter = session.get(letters_db.Letter, letter_id)
+
+    if not letter:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "No letter exists with the given id")
+
+    file_name = f"{letter.id}.pdf"
+    template = templates_db.get_template_by_shipment(letter.shipment_id)
+
+    # Pdf templates are sent as is and aren't stored per letter
+    if not template.file_name.endswith(".docx"):
+        etag = f'"{hashlib.sha256(template.file_data).hexdigest()}"'
+        response = Response(
+            template.file_data,
+            media_type="application/pdf",
+            headers={"ETag": etag, "Content-Disposition": f'attachment; filename="{file_name}"'}
+        )
+        return _conditional_response(request, response)
+
+    render_hash = letter.get_render_hash()
+    doc_path = document_storage.get_rendered_doc_file(letter.shipment_id, render_hash)
+    if not doc_path:
+        letter.merge_letter()
+        doc_path = document_storage.get_rendered_doc_file(letter.shipment_id, render_hash)
+
+    # The render hash identifies the content of the letter so it makes a strong ETag
+    response = FileResponse(doc_path, media_type="application/pdf", filename=file_name, headers={"ETag": f'"{render_hash}"'}, stat_result=doc_path.stat())
+    return _conditional_response(request, response)
+
+
+def _conditional_response(request: Request, response: Response) -> Response:
+    """Replace the response with an empty 304 Not Modified response
+    if the client's cached copy is still valid according to the
+    If-None-Match or If-Modified-Since request headers.
+
+    Args:
+        request: The incoming request.
+        response: The full response including ETag and Last-Modified headers.
+
+    Returns:
+        The response to send to the client.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_none_match is not None:
+        # Weak comparison as required for If-None-Match
+        etags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        not_modified = "*" in etags or response.headers.get("etag", "").removeprefix("W/") in etags
+    elif if_modified_since and "last-modified" in response.headers:
+        try:
+            not_modified = parsedate_to_datetime(response.headers["last-modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            not_modified = False
+    else:
+        not_modified = False
+
+    if not not_modified:
+        return response
+
+    headers = {key: response.headers[key] for key in ("etag", "last-modified") if key in response.headers}
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -109,6 +109,11 @@ class DetailPage():
         ui.label("Status:").classes("text-bold")
         self._show_shipment_status()
 
+        if self.shipment.registration_job_id:
+            ui.label("Tilmeldingstjek:").classes("text-bold")
+            ui.link(self.shipment.registration_job_id, app.url_path_for("Registration Detail", job_id=self.shipment.registration_job_id))
+            self._show_registration_status()
+
         ui.button("Afbryd forsendelse", color="negative", on_click=self._abort_shipment)
 
         self._show_letters_table()
@@ -137,6 +142,11 @@ class DetailPage():
         self.letter_table = ui_components.SearchTable(title="Breve", rows=letter_rows, columns=LETTERS_COLUMNS, column_defaults=COLUMN_DEFAULTS, pagination=50, download_button=True, search_field=True)
         ui_components.obscure_id_column(self.letter_table, "recipient")
 
+    def _show_registration_status(self):
+        """Show the expected split between Digital Post and not registered recipients."""
+        rows = [{"name": s, "value": v} for s, v in db_util.calculate_registration_job_status(self.shipment.registration_job_id)]
+        ui.table(rows=rows).props("hide-header flat bordered separator=cell")
+
     @ui.refreshable
     def _show_shipment_status(self):
         """Show the status of the entire shipment."""
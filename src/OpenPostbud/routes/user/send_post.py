@@ -13,7 +13,7 @@ from nicegui.events import UploadEventArguments
 from jinja2.exceptions import TemplateSyntaxError
 
 from OpenPostbud import ui_components
-from OpenPostbud.database import document_storage
+from OpenPostbud.database import db_util, document_storage
 from OpenPostbud.middleware import authentication
 from OpenPostbud.database.digital_post import letters, shipments, templates
 from OpenPostbud.database.digital_post.letters import MemoFields
@@ -93,7 +93,10 @@ class SendPostPage:
                 authentication.get_current_user(),
                 template_id,
                 self.step1.post_type.value)
-            letters.add_letters(shipment_id, self.step2.csv_data)
+            if self.step1.post_type.value == PostType.PHYSICAL:
+                letters.add_letters(shipment_id, self.step2.csv_data)
+            else:
+                db_util.add_letters_with_registration_job(shipment_id, self.step2.csv_data)
             document_storage.add_attachments(shipment_id, attachments)
             ui.navigate.to(app.url_path_for("Shipment Detail", shipment_id=shipment_id))
         finally:
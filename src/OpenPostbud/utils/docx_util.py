@@ -1,10 +1,67 @@
 """This module contains functions to work with docx files."""
 
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
 from io import BytesIO
+from functools import lru_cache
+from pathlib import PurePath
 import logging
+import threading
+import zipfile
 
 from docxtpl import DocxTemplate
+from jinja2 import Environment, Template
 import requests
+from requests.adapters import HTTPAdapter
+
+
+CONVERTER_URL = "http://gotenberg:3000/forms/libreoffice/convert"
+CONVERTER_CONNECT_TIMEOUT = 5
+# The read timeout is scaled with the number of documents in a conversion
+CONVERTER_READ_TIMEOUT_PER_DOCUMENT = 30
+CONVERTER_POOL_SIZE = 16
+
+# The maximum number of compiled xml parts kept in memory.
+# A template usually consists of a body and a few headers and footers.
+TEMPLATE_CACHE_SIZE = 32
+
+
+class _CachingEnvironment(Environment):
+    """A jinja environment that caches compiled templates by their source.
+    docxtpl compiles every xml part of a template on each render. The xml parts
+    are identical for all letters using the same template, so the compiled
+    templates can be reused and only the field data changes between renders.
+    The cache is bounded and evicts the least recently used template.
+    """
+    def __init__(self, cache_size: int):
+        super().__init__()
+        self._cache_size = cache_size
+        self._compiled_templates: OrderedDict[str, Template] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    # pylint: disable=redefined-builtin
+    def from_string(self, source, globals=None, template_class=None) -> Template:
+        """Get a compiled template from the cache or compile it if it isn't cached."""
+        if globals or template_class:
+            return super().from_string(source, globals, template_class)
+
+        with self._cache_lock:
+            template = self._compiled_templates.get(source)
+            if template:
+                self._compiled_templates.move_to_end(source)
+                return template
+
+        template = super().from_string(source)
+
+        with self._cache_lock:
+            self._compiled_templates[source] = template
+            if len(self._compiled_templates) > self._cache_size:
+                self._compiled_templates.popitem(last=False)
+
+        return template
+
+
+_jinja_env = _CachingEnvironment(TEMPLATE_CACHE_SIZE)
 
 
 def get_merge_fields(word_template: bytes) -> list[str]:
@@ -23,6 +80,7 @@ def get_merge_fields(word_template: bytes) -> list[str]:
 
 def merge_word_file(word_template: bytes, field_data: dict[str, str]) -> bytes:
     """Merge a Word template with the given merge field values.
+    The compiled xml parts of the template are cached between calls.
 
     Args:
         word_template: The Word template as bytes.
@@ -34,12 +92,77 @@ def merge_word_file(word_template: bytes, field_data: dict[str, str]) -> bytes:
     merged_template = BytesIO()
 
     template = DocxTemplate(BytesIO(word_template))
-    template.render(field_data)
+    template.render(field_data, jinja_env=_jinja_env)
     template.save(merged_template)
 
     return merged_template.getvalue()
 
 
+# The Word template loaded into each merge process by MergePool
+_process_template: bytes | None = None
+
+
+def _init_merge_process(word_template: bytes):
+    """Initialize a merge process with the Word template to merge."""
+    global _process_template  # pylint: disable=global-statement
+    _process_template = word_template
+
+
+def _merge_process_template(field_data: dict[str, str]) -> bytes:
+    """Merge the Word template loaded into the current process."""
+    return merge_word_file(_process_template, field_data)
+
+
+class MergePool:
+    """A pool of processes merging Word files in parallel.
+    The Word template is sent to each process once when the pool is started
+    and the pool is restarted whenever a different template is merged.
+    """
+    def __init__(self, processes: int):
+        """
+        Args:
+            processes: The number of processes in the pool.
+        """
+        self._processes = processes
+        self._executor: ProcessPoolExecutor | None = None
+        self._word_template: bytes | None = None
+
+    def submit_merges(self, word_template: bytes, field_data_list: list[dict[str, str]]) -> list[Future[bytes]]:
+        """Submit multiple merges of the same Word template to the pool.
+
+        Args:
+            word_template: The Word template as bytes.
+            field_data_list: A list of merge field data dicts. One per merged file.
+
+        Returns:
+            A list of futures resolving to the merged Word files in the same order as the input.
+        """
+        if self._executor is None or self._word_template != word_template:
+            self.shutdown()
+            self._executor = ProcessPoolExecutor(self._processes, initializer=_init_merge_process, initargs=(word_template,))
+            self._word_template = word_template
+
+        return [self._executor.submit(_merge_process_template, field_data) for field_data in field_data_list]
+
+    def shutdown(self):
+        """Shut down the processes in the pool if any."""
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+            self._word_template = None
+
+
+@lru_cache(maxsize=1)
+def _get_converter_session() -> requests.Session:
+    """Get a pooled http session to the converter.
+    Connections are kept alive and reused between conversions.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONVERTER_POOL_SIZE)
+    session.mount("http://", adapter)
+    return session
+
+
 def convert_word_to_pdf(document: bytes) -> bytes:
     """Convert a docx file to pdf using the Gotenberg PDF converter api.
 
@@ -49,8 +172,65 @@ def convert_word_to_pdf(document: bytes) -> bytes:
     Returns:
         The converted pdf file as bytes.
     """
-    logging.info(f"Sending word file to converter. Size {len(document)}")
-    result = requests.post("http://gotenberg:3000/forms/libreoffice/convert", files={"files": ("document.docx", document)}, timeout=30)
+    return convert_word_files_to_pdf([document])[0]
+
+
+def convert_word_files_to_pdf(documents: list[bytes]) -> list[bytes]:
+    """Convert multiple docx files to pdf in a single request to the
+    Gotenberg PDF converter api.
+    If the returned archive doesn't contain a pdf named after each file
+    the files are instead converted one by one.
+
+    Args:
+        documents: A list of docx files as bytes.
+
+    Returns:
+        A list of the converted pdf files as bytes in the same order as the input.
+    """
+    if not documents:
+        return []
+
+    file_names = [f"{i}.docx" for i in range(len(documents))]
+    files = [("files", (file_name, document)) for file_name, document in zip(file_names, documents)]
+    timeout = (CONVERTER_CONNECT_TIMEOUT, CONVERTER_READ_TIMEOUT_PER_DOCUMENT * len(documents))
+
+    logging.info(f"Sending {len(documents)} word files to converter. Size {sum(len(d) for d in documents)}")
+    result = _get_converter_session().post(CONVERTER_URL, files=files, timeout=timeout)
     result.raise_for_status()
-    logging.info(f"Received pdf from converter. Size: {len(result.content)}")
-    return result.content
+    logging.info(f"Received result from converter. Size: {len(result.content)}")
+
+    # Gotenberg returns a single pdf for one file and a zip archive for multiple files
+    if len(documents) == 1:
+        return [result.content]
+
+    try:
+        return _split_converter_archive(result.content, file_names)
+    except (ValueError, zipfile.BadZipFile) as e:
+        logging.warning(f"Couldn't read the converter archive. Converting the files one by one instead: {e}")
+        return [convert_word_to_pdf(document) for document in documents]
+
+
+def _split_converter_archive(archive: bytes, file_names: list[str]) -> list[bytes]:
+    """Split a zip archive from the converter into a list of pdf files.
+    Each pdf is looked up by the name of the file it was converted from
+    with the extension replaced by .pdf.
+
+    Args:
+        archive: The zip archive as bytes.
+        file_names: The names of the files sent to the converter.
+
+    Returns:
+        A list of pdf files as bytes in the same order as the file names.
+
+    Raises:
+        ValueError: If the archive doesn't contain a pdf for each file.
+    """
+    with zipfile.ZipFile(BytesIO(archive)) as zip_file:
+        members = {PurePath(name).name: name for name in zip_file.namelist()}
+        pdf_names = [PurePath(file_name).with_suffix(".pdf").name for file_name in file_names]
+
+        missing = [pdf_name for pdf_name in pdf_names if pdf_name not in members]
+        if missing:
+            raise ValueError(f"Converter archive is missing {missing}. It contains {sorted(members)}.")
+
+        return [zip_file.read(members[pdf_name]) for pdf_name in pdf_names]
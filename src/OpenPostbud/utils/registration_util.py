@@ -0,0 +1,40 @@
+"""This module contains functions to look up registrations for Digital Post and NemSMS."""
+
+import logging
+
+from python_serviceplatformen import digital_post
+from python_serviceplatformen.authentication import KombitAccess
+
+from OpenPostbud import config
+from OpenPostbud.database.check_registration import registration_cache
+from OpenPostbud.database.check_registration.registration_job import JobType
+
+
+def is_registered(recipient_id: str, registration_type: JobType, kombit_access: KombitAccess) -> bool:
+    """Check if the recipient is registered for the given registration type.
+    Lookups are cached in the database for REGISTRATION_CACHE_SECONDS.
+
+    Args:
+        recipient_id: The CPR or CVR number of the recipient.
+        registration_type: The type of registration to check.
+        kombit_access: The KombitAccess object to authenticate against the Kombit API.
+
+    Returns:
+        True if the recipient is registered.
+    """
+    if config.REGISTRATION_CACHE_SECONDS <= 0:
+        return digital_post.is_registered(recipient_id, registration_type.value, kombit_access)
+
+    registered = registration_cache.get_cached_registration(recipient_id, registration_type)
+    if registered is not None:
+        return registered
+
+    registered = digital_post.is_registered(recipient_id, registration_type.value, kombit_access)
+
+    # The lookup succeeded so a failure to cache it must not fail the caller
+    try:
+        registration_cache.cache_registration(recipient_id, registration_type, registered)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logging.exception("Failed to cache registration lookup")
+
+    return registered
@@ -0,0 +1,136 @@
+"""This module contains a local notification channel used to wake up idle workers.
+Each listening worker process binds a unix datagram socket in a folder per channel.
+Notifying a channel sends a datagram to every socket in the folder.
+The workers still poll the database at their sleep interval as a fallback
+in case a signal is lost or unix sockets aren't available.
+"""
+
+from enum import Enum
+from pathlib import Path
+import heapq
+import logging
+import math
+import select
+import socket
+import time
+import uuid
+
+from OpenPostbud import config
+
+
+SIGNAL_FOLDER = Path(config.WORKER_SIGNAL_FOLDER)
+
+
+class Channel(Enum):
+    """An enum of the channels workers can listen on."""
+    SHIPMENT = "shipment"
+    RENDER = "render"
+    NEMSMS = "nemsms"
+    REGISTRATION = "registration"
+
+
+class SignalListener:
+    """A listener on a channel used by a worker to wait for new work."""
+    def __init__(self, channel: Channel):
+        """
+        Args:
+            channel: The channel to listen on.
+        """
+        # A heap of times when signaled work becomes available
+        self._due_times: list[float] = []
+        self._socket: socket.socket | None = None
+        self._path = SIGNAL_FOLDER / channel.value / f"{uuid.uuid4()}.sock"
+
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)  # pylint: disable=no-member
+            sock.bind(str(self._path))
+            self._socket = sock
+        except (AttributeError, OSError) as e:
+            logging.warning(f"Worker signals unavailable. Falling back to polling: {e}")
+
+    def __enter__(self) -> "SignalListener":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def wait(self, timeout: float):
+        """Block until a signal is due or the timeout has passed.
+
+        Args:
+            timeout: The maximum number of seconds to wait.
+        """
+        deadline = time.time() + timeout
+
+        if not self._socket:
+            time.sleep(timeout)
+            return
+
+        while True:
+            now = time.time()
+
+            if self._due_times and self._due_times[0] <= now:
+                # All due signals are handled by the next database query
+                while self._due_times and self._due_times[0] <= now:
+                    heapq.heappop(self._due_times)
+                return
+
+            if now >= deadline:
+                return
+
+            wake_time = min(deadline, self._due_times[0]) if self._due_times else deadline
+            readable, _, _ = select.select([self._socket], [], [], wake_time - now)
+            if readable:
+                data = self._socket.recv(64)
+                try:
+                    due_time = float(data.decode())
+                except (UnicodeDecodeError, ValueError):
+                    due_time = math.nan
+
+                if not math.isfinite(due_time):
+                    logging.warning(f"Ignoring malformed worker signal: {data!r}")
+                    continue
+
+                heapq.heappush(self._due_times, due_time)
+
+    def close(self):
+        """Close the listener and remove its socket file."""
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+            self._path.unlink(missing_ok=True)
+
+
+def notify(channel: Channel, delay: float = 0):
+    """Notify all workers listening on the given channel that new work is available.
+    Errors are logged and ignored since the workers fall back to polling.
+
+    Args:
+        channel: The channel to notify.
+        delay: The number of seconds until the work becomes available. Defaults to 0.
+    """
+    folder = SIGNAL_FOLDER / channel.value
+
+    if not folder.is_dir():
+        return
+
+    message = str(time.time() + delay).encode()
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)  # pylint: disable=no-member
+    except (AttributeError, OSError) as e:
+        logging.warning(f"Couldn't notify workers on channel {channel.value}: {e}")
+        return
+
+    with sock:
+        sock.setblocking(False)
+        for path in folder.glob("*.sock"):
+            try:
+                sock.sendto(message, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The listener is no longer running
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                # E.g. the listener's buffer is full, meaning it's already signaled
+                logging.debug(f"Couldn't notify worker {path}: {e}")
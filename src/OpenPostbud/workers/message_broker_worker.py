@@ -2,15 +2,18 @@
 It is spawned as a separate process next to the UI process.
 """
 
-from xml.etree import ElementTree
 import base64
+from dataclasses import dataclass
 from datetime import datetime
 import logging
+import ssl
 import time
 import uuid
 from pathlib import Path
 
-from sqlalchemy import select
+from lxml import etree
+import pika
+from sqlalchemy import select, update
 from python_serviceplatformen.authentication import KombitAccess
 from python_serviceplatformen import message_broker
 
@@ -21,6 +24,9 @@ from OpenPostbud.database.common import ShipmentStatus
 from OpenPostbud.database.nemsms.nemsms_messages import NemSMSMessage
 
 
+# The entity id of the Beskedfordeler service used when requesting a SAML token
+MESSAGE_BROKER_ENTITY_ID = "http://entityid.kombit.dk/service/bfo_modtag/2"
+
 # Silence pika's DEBUG and INFO messages
 logging.getLogger("pika").setLevel(logging.WARNING)
 
@@ -81,6 +87,28 @@ MESSAGE_NAMESPACES = {
     "default": "http://serviceplatformen.dk/xml/print/PKO_PostStatus/1/types"
 }
 
+# Precompiled XPath expressions for the fields used from the envelope and message data
+SENDER_UUID_PATH = etree.XPath("kuvert:Beskedkuvert/kuvert:Filtreringsdata/kuvert:BeskedAnsvarligAktoer/default:UUIDIdentifikator/text()", namespaces=ENVELOPE_NAMESPACES)
+EVENT_UUID_PATH = etree.XPath("kuvert:Beskedkuvert/kuvert:Filtreringsdata/kuvert:ObjektRegistrering/kuvert:ObjektHandling/default:UUIDIdentifikator/text()", namespaces=ENVELOPE_NAMESPACES)
+MESSAGE_TIME_PATH = etree.XPath("kuvert:Beskedkuvert/kuvert:Leveranceinformation/kuvert:Dannelsestidspunkt/default:TidsstempelDatoTid/text()", namespaces=ENVELOPE_NAMESPACES)
+MESSAGE_DATA_PATH = etree.XPath("kuvert:Beskeddata/besked:Base64/text()", namespaces=ENVELOPE_NAMESPACES)
+MESSAGE_UUID_PATH = etree.XPath("default:MessageUUID/text()", namespaces=MESSAGE_NAMESPACES)
+AFSENDELSE_ID_PATH = etree.XPath("default:AfsendelseIdentifikator/text()", namespaces=MESSAGE_NAMESPACES)
+ERROR_TEXT_PATH = etree.XPath("default:FejlDetaljer/default:FejlTekst/text()", namespaces=MESSAGE_NAMESPACES)
+
+XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+# Errors raised when a message doesn't have the expected format
+MESSAGE_FORMAT_ERRORS = (ValueError, IndexError, etree.XMLSyntaxError)
+
+
+@dataclass
+class StatusUpdate:
+    """A dataclass representing a status update read from a message broker message."""
+    transaction_id: str
+    event_name: str
+    error_message: str | None
+
 
 def start_process():
     """The entry point of the worker process.
@@ -94,63 +122,138 @@ def start_process():
 
     while True:
         logging.info("Checking queue for new messages")
-        for message in message_broker.iterate_queue_messages(config.MESSAGE_BROKER_QUEUE_ID, kombit_access, True):
-            message = message.decode()
-            try:
-                handle_message(message)
-            except AttributeError:
-                save_failed_message(message)
+        handle_queue(kombit_access)
 
         logging.info(f"Sleeping for {config.MESSAGE_BROKER_WORKER_SLEEP_TIME} seconds")
         time.sleep(config.MESSAGE_BROKER_WORKER_SLEEP_TIME)
 
 
-def handle_message(message: str):
+def handle_queue(kombit_access: KombitAccess):
+    """Handle all messages in the queue in windows of MESSAGE_BROKER_WINDOW_SIZE messages.
+    The status updates of a window are applied in a single transaction and the
+    messages are only acknowledged after the transaction has been committed.
+    Unacknowledged messages are returned to the queue if the worker fails.
+
+    Args:
+        kombit_access: The KombitAccess object used to authenticate against the queue.
+    """
+    # The library's iterate_queue_messages can't acknowledge messages after they are read
+    params = _get_connection_params(kombit_access)
+
+    with pika.BlockingConnection(parameters=params) as pika_connection:
+        channel = pika_connection.channel()
+
+        while True:
+            messages = []
+            delivery_tag = None
+
+            while len(messages) < config.MESSAGE_BROKER_WINDOW_SIZE:
+                method_frame, _, body = channel.basic_get(config.MESSAGE_BROKER_QUEUE_ID, auto_ack=False)
+                if not method_frame:
+                    break  # Queue is empty
+
+                messages.append(body)
+                delivery_tag = method_frame.delivery_tag
+
+            if not messages:
+                return
+
+            handle_messages(messages)
+            channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+
+
+def _get_connection_params(kombit_access: KombitAccess) -> pika.ConnectionParameters:
+    """Get the parameters used to connect to the message broker.
+    The connection is authenticated with a SAML token for the Beskedfordeler service.
+
+    Args:
+        kombit_access: The KombitAccess object used to authenticate.
+
+    Returns:
+        The connection parameters of the message broker.
+    """
+    saml_token = base64.b64decode(kombit_access.get_saml_token(MESSAGE_BROKER_ENTITY_ID))
+    host = message_broker.TEST_HOST if kombit_access.test else message_broker.PROD_HOST
+
+    return pika.ConnectionParameters(
+        host=host,
+        port=message_broker.PORT,
+        virtual_host=message_broker.VIRTUAL_HOST,
+        ssl_options=pika.SSLOptions(context=ssl.create_default_context(), server_hostname=host),
+        credentials=message_broker.TokenCredentials(token=saml_token)
+    )
+
+
+def handle_messages(messages: list[bytes]):
+    """Read a window of messages and apply the resulting status updates.
+    Messages that can't be read are saved to a file.
+
+    Args:
+        messages: The raw XML messages.
+    """
+    status_updates = []
+
+    for message in messages:
+        try:
+            status_update = handle_message(message)
+        except MESSAGE_FORMAT_ERRORS as e:
+            logging.error(f"Couldn't read message: {e}")
+            save_failed_message(message)
+            continue
+
+        if status_update:
+            status_updates.append(status_update)
+
+    apply_status_updates(status_updates)
+
+
+def handle_message(message: bytes) -> StatusUpdate | None:
     """Decode an incoming message from the message broker.
     Compare the sender id and event id to the known list of ids.
     If the sender id or event id are not recognized log an error
     and ignore the message.
 
     Args:
-        message: The XML message as a string.
+        message: The raw XML message. It is parsed as is so its encoding declaration is respected.
+
+    Returns:
+        The status update described by the message if it was recognized.
     """
     # Decode envelope
-    envelope_tree = ElementTree.fromstring(message)
+    envelope_tree = etree.fromstring(message, XML_PARSER)
 
-    sender_uuid = envelope_tree.find("kuvert:Beskedkuvert/kuvert:Filtreringsdata/kuvert:BeskedAnsvarligAktoer/default:UUIDIdentifikator", ENVELOPE_NAMESPACES).text
+    sender_uuid = SENDER_UUID_PATH(envelope_tree)[0]
     sender_name = SENDERS.get(sender_uuid)
 
-    event_uuid = envelope_tree.find("kuvert:Beskedkuvert/kuvert:Filtreringsdata/kuvert:ObjektRegistrering/kuvert:ObjektHandling/default:UUIDIdentifikator", ENVELOPE_NAMESPACES).text
+    event_uuid = EVENT_UUID_PATH(envelope_tree)[0]
     event_name = EVENTS_DIGITAL.get(event_uuid) or EVENTS_PHYSICAL.get(event_uuid)
 
-    message_time = envelope_tree.find("kuvert:Beskedkuvert/kuvert:Leveranceinformation/kuvert:Dannelsestidspunkt/default:TidsstempelDatoTid", ENVELOPE_NAMESPACES).text
-    message_time = datetime.fromisoformat(message_time)
+    message_time = datetime.fromisoformat(MESSAGE_TIME_PATH(envelope_tree)[0])
 
     if not sender_name or not event_name:
         logging.error(f"Unknown message received. Sender: {sender_name or sender_uuid} - Event: {event_name or event_uuid} - Message time: {message_time}")
         save_failed_message(message)
-        return
+        return None
 
     logging.info(f"Message received: {message_time} - {sender_name=} - {event_name=}")
 
-    message_data = envelope_tree.find("kuvert:Beskeddata/besked:Base64", ENVELOPE_NAMESPACES).text
-    message_data = base64.b64decode(message_data).decode()
+    message_data = base64.b64decode(MESSAGE_DATA_PATH(envelope_tree)[0])
 
     if sender_name == "Digital Post":
-        handle_digital_post_message(
-            message_time=message_time,
-            sender_name=sender_name,
-            event_name=event_name,
-            message_data=message_data)
-    else:
-        handle_physical_mail_message(
+        return handle_digital_post_message(
             message_time=message_time,
             sender_name=sender_name,
             event_name=event_name,
             message_data=message_data)
 
+    return handle_physical_mail_message(
+        message_time=message_time,
+        sender_name=sender_name,
+        event_name=event_name,
+        message_data=message_data)
+
 
-def handle_digital_post_message(message_time: str, sender_name: str, event_name: str, message_data: str):
+def handle_digital_post_message(message_time: str, sender_name: str, event_name: str, message_data: bytes) -> StatusUpdate:
     """Handle a message from the Digital Post sender.
 
     Args:
@@ -158,20 +261,21 @@ def handle_digital_post_message(message_time: str, sender_name: str, event_name:
         sender_name: The sender name from the message.
         event_name: The event name from the message.
         message_data: The decoded base64 message data.
+
+    Returns:
+        The status update described by the message.
     """
     # Decode message
-    message_tree = ElementTree.fromstring(message_data)
-    message_uuid = message_tree.find("default:MessageUUID", MESSAGE_NAMESPACES).text
-    error_message = message_tree.find("default:FejlDetaljer/default:FejlTekst", MESSAGE_NAMESPACES)
-    if error_message is not None:
-        error_message = error_message.text
+    message_tree = etree.fromstring(message_data, XML_PARSER)
+    message_uuid = MESSAGE_UUID_PATH(message_tree)[0]
+    error_message = next(iter(ERROR_TEXT_PATH(message_tree)), None)
 
     logging.info(f"Message received: {message_time} - {sender_name=} - {event_name=} - {message_uuid=} - {error_message=}")
 
-    update_letter_status(message_uuid, event_name, error_message)
+    return StatusUpdate(message_uuid, event_name, error_message)
 
 
-def handle_physical_mail_message(message_time: str, sender_name: str, event_name: str, message_data: str):
+def handle_physical_mail_message(message_time: str, sender_name: str, event_name: str, message_data: bytes) -> StatusUpdate:
     """Handle a status message from a physical mail (Fjernprint) provider.
 
     Args:
@@ -179,69 +283,78 @@ def handle_physical_mail_message(message_time: str, sender_name: str, event_name
         sender_name: The sender name from the message.
         event_name: The event name from the message.
         message_data: The decoded base64 message data.
+
+    Returns:
+        The status update described by the message.
     """
     # Decode message
-    message_tree = ElementTree.fromstring(message_data)
-    afsendelse_id = message_tree.find("default:AfsendelseIdentifikator", MESSAGE_NAMESPACES).text
-    error_message = message_tree.find("default:FejlDetaljer/default:FejlTekst", MESSAGE_NAMESPACES)
-    if error_message is not None:
-        error_message = error_message.text
+    message_tree = etree.fromstring(message_data, XML_PARSER)
+    afsendelse_id = AFSENDELSE_ID_PATH(message_tree)[0]
+    error_message = next(iter(ERROR_TEXT_PATH(message_tree)), None)
 
     logging.info(f"Message received: {message_time} - {sender_name=} - {event_name=} - {afsendelse_id=} - {error_message=}")
 
-    update_letter_status(afsendelse_id, event_name, error_message)
+    return StatusUpdate(afsendelse_id, event_name, error_message)
 
 
-def update_letter_status(transaction_id: str, event_name: str, error: str | None):
-    """Update the status of a letter in the database that matches the given transaction id.
+def apply_status_updates(status_updates: list[StatusUpdate]):
+    """Apply the given status updates to the letters and NemSMS messages with
+    matching transaction ids in a single transaction.
+    If multiple updates concern the same transaction id the last one is applied.
 
     Args:
-        transaction_id: The transaction id from the message broker message.
-        event_name: The name of the message event as defined in the event dicts.
-        error_message: The error from the message if any.
+        status_updates: The status updates to apply in the order they were received.
     """
-    letter_or_message = get_letter_or_nemsms_message(transaction_id)
-
-    if not letter_or_message:
-        logging.error(f"No letter or message with transaction id {transaction_id} found in database.")
+    if not status_updates:
         return
 
-    status = EVENT_MAP[event_name]
+    transaction_ids = {status_update.transaction_id for status_update in status_updates}
 
-    if status == ShipmentStatus.DELIVERED:
-        letter_or_message.set_status(ShipmentStatus.DELIVERED)
-    elif status == ShipmentStatus.FAILED:
-        letter_or_message.set_status(ShipmentStatus.FAILED, message=error)
-    elif status == ShipmentStatus.SENT:
-        letter_or_message.set_status(ShipmentStatus.SENT, message=event_name)
+    with connection.get_session() as session:
+        q = select(Letter.transaction_id, Letter.id).where(Letter.transaction_id.in_(transaction_ids))
+        letter_ids = dict(session.execute(q).all())
 
-    logging.info(f"Status updated on letter or message {letter_or_message.id}")
+        q = select(NemSMSMessage.transaction_id, NemSMSMessage.id).where(NemSMSMessage.transaction_id.in_(transaction_ids))
+        message_ids = dict(session.execute(q).all())
 
+        letter_values = {}
+        message_values = {}
 
-def get_letter_or_nemsms_message(transaction_id: str) -> Letter | NemSMSMessage | None:
-    """Get a letter or nemsms message with the given transaction id.
+        for status_update in status_updates:
+            status, message = _get_status_and_message(status_update)
 
-    Args:
-        transaction_id: The transaction id to look for.
+            if status_update.transaction_id in letter_ids:
+                letter_id = letter_ids[status_update.transaction_id]
+                letter_values[letter_id] = {"id": letter_id, "status": status, "message": message, "updated_at": datetime.now()}
+            elif status_update.transaction_id in message_ids:
+                message_id = message_ids[status_update.transaction_id]
+                message_values[message_id] = {"id": message_id, "status": status, "status_message": message, "updated_at": datetime.now()}
+            else:
+                logging.error(f"No letter or message with transaction id {status_update.transaction_id} found in database.")
 
-    Returns:
-        The letter or NemSMS message with the given transaction id if any.
-    """
-    with connection.get_session() as session:
-        q = select(Letter).where(Letter.transaction_id == transaction_id)
-        letter = session.execute(q).scalar_one_or_none()
-        if letter:
-            return letter
+        if letter_values:
+            session.execute(update(Letter), list(letter_values.values()))
+        if message_values:
+            session.execute(update(NemSMSMessage), list(message_values.values()))
+
+        session.commit()
+
+    logging.info(f"Status updated on {len(letter_values)} letters and {len(message_values)} messages")
+
+
+def _get_status_and_message(status_update: StatusUpdate) -> tuple[ShipmentStatus, str | None]:
+    """Get the status and status message to set on a letter or message from a status update."""
+    status = EVENT_MAP[status_update.event_name]
 
-        q = select(NemSMSMessage).where(NemSMSMessage.transaction_id == transaction_id)
-        message = session.execute(q).scalar_one_or_none()
-        if message:
-            return message
+    if status == ShipmentStatus.FAILED:
+        return status, status_update.error_message
+    if status == ShipmentStatus.SENT:
+        return status, status_update.event_name
 
-    return None
+    return status, None
 
 
-def save_failed_message(message: str):
+def save_failed_message(message: bytes):
     """Save the given message to a file in the folder 'failed_messages'.
 
     Args:
@@ -251,7 +364,7 @@ def save_failed_message(message: str):
     folder.mkdir(exist_ok=True)
 
     file_path = folder / Path(str(uuid.uuid4())).with_suffix(".xml")
-    file_path.write_text(message)
+    file_path.write_bytes(message)
 
     logging.error(f"Error while reading message. Message saved to {file_path}")
 
@@ -4,7 +4,6 @@ It is spawned as a separate process next to the UI process.
 
 from datetime import datetime, timedelta
 import logging
-import time
 
 from requests import Timeout
 from sqlalchemy import select, update
@@ -18,6 +17,8 @@ from OpenPostbud.database import connection
 from OpenPostbud.database.nemsms.nemsms_messages import NemSMSMessage
 from OpenPostbud.database.nemsms import nemsms_shipments
 from OpenPostbud.database.common import ShipmentStatus
+from OpenPostbud.database.check_registration.registration_job import JobType
+from OpenPostbud.utils import registration_util, worker_signal
 
 
 def start_process():
@@ -30,21 +31,22 @@ def start_process():
 
     logging.info("NemSMS worker started")
 
-    while True:
-        message = get_waiting_message()
-        if message:
-            logging.info(f"Waiting NemSMS message found: {message.id}")
-            try:
-                send_message(message, kombit_access)
-            except Timeout:
-                message.set_status(ShipmentStatus.WAITING, message="Timeout. Prøver igen.")
-                logging.error(f"Sending message {message.id} timed out.")
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                message.set_status(ShipmentStatus.FAILED, message="Systemfejl: e.__class__.__name__")
-                logging.error(f"Sending message {message.id} failed: {e}")
-        else:
-            logging.debug(f"Sleeping for {config.SHIPMENT_WORKER_SLEEP_TIME} seconds")
-            time.sleep(config.SHIPMENT_WORKER_SLEEP_TIME)
+    with worker_signal.SignalListener(worker_signal.Channel.NEMSMS) as listener:
+        while True:
+            message = get_waiting_message()
+            if message:
+                logging.info(f"Waiting NemSMS message found: {message.id}")
+                try:
+                    send_message(message, kombit_access)
+                except Timeout:
+                    message.set_status(ShipmentStatus.WAITING, message="Timeout. Prøver igen.")
+                    logging.error(f"Sending message {message.id} timed out.")
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    message.set_status(ShipmentStatus.FAILED, message="Systemfejl: e.__class__.__name__")
+                    logging.error(f"Sending message {message.id} failed: {e}")
+            else:
+                logging.debug(f"Waiting for up to {config.SHIPMENT_WORKER_SLEEP_TIME} seconds")
+                listener.wait(config.SHIPMENT_WORKER_SLEEP_TIME)
 
 
 def get_waiting_message() -> NemSMSMessage | None:
@@ -62,6 +64,7 @@ def get_waiting_message() -> NemSMSMessage | None:
                 datetime.now() - timedelta(seconds=config.SHIPMENT_WORKER_DELAY) > NemSMSMessage.updated_at
             )
             .limit(1)
+            .with_for_update(skip_locked=True)
             .scalar_subquery()
         )
 
@@ -87,7 +90,7 @@ def send_message(nemsms_message: NemSMSMessage, kombit_access: KombitAccess):
     """Send a message using NemSMS.
     First checks if the recipient is registered to receive NemSMS.
     """
-    if not digital_post.is_registered(nemsms_message.recipient_id, 'nemsms', kombit_access):
+    if not registration_util.is_registered(nemsms_message.recipient_id, JobType.NEMSMS, kombit_access):
         nemsms_message.set_status(ShipmentStatus.FAILED, message="Ikke tilmeldt NemSMS")
         logging.info(f"Message not sent. The recipient is not registered for NemSMS. {nemsms_message.id}")
         return
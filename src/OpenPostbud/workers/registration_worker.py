@@ -3,63 +3,75 @@ for performing registration tasks created in the web application.
 It is spawned as a separate process next to the UI process.
 """
 
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 
-from python_serviceplatformen import digital_post
 from python_serviceplatformen.authentication import KombitAccess
 from sqlalchemy import select, update
 
 from OpenPostbud import config
 from OpenPostbud.database import connection
 from OpenPostbud.database.check_registration.registration_task import RegistrationTask, TaskStatus
-from OpenPostbud.database.check_registration import registration_job
+from OpenPostbud.database.check_registration import registration_job, registration_task
+from OpenPostbud.utils import registration_util, worker_signal
 
 
 def start_process():
     """The entry point of the worker process.
-
-    Raises:
-        RuntimeError: If any exception is raised when handling a task.
+    Tasks are claimed in batches and up to REGISTRATION_WORKER_CONCURRENCY
+    lookups from each batch are performed concurrently.
+    Tasks that have been checking for longer than REGISTRATION_TASK_TIMEOUT
+    are reset to waiting before each batch is claimed.
     """
     kombit_access = KombitAccess(config.CVR, config.KOMBIT_CERT_PATH, test=config.KOMBIT_TEST_ENV)
 
-    logging.info("Registration worker started.")
-
-    while True:
-        task = get_waiting_task()
-        if task:
-            try:
-                logging.info(f"Starting task {task.id}")
-                handle_task(task, kombit_access)
-                logging.info(f"Task done {task.id}")
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                fail_task(task)
-                logging.error(f"Task failed {task.id}: {e}")
-        else:
-            logging.debug(f"Sleeping for {config.REGISTRATION_WORKER_SLEEP_TIME} seconds")
-            time.sleep(config.REGISTRATION_WORKER_SLEEP_TIME)
+    logging.info(f"Registration worker started. Concurrency: {config.REGISTRATION_WORKER_CONCURRENCY}")
+
+    with ThreadPoolExecutor(max_workers=config.REGISTRATION_WORKER_CONCURRENCY) as executor, worker_signal.SignalListener(worker_signal.Channel.REGISTRATION) as listener:
+        while True:
+            # Tasks claimed by a worker that stopped would otherwise never be checked
+            reset_count = registration_task.reset_stale_tasks(config.REGISTRATION_TASK_TIMEOUT)
+            if reset_count:
+                logging.info(f"Reset {reset_count} stale tasks")
+
+            tasks = get_waiting_tasks(config.REGISTRATION_WORKER_BATCH_SIZE)
+            if tasks:
+                logging.info(f"Starting {len(tasks)} tasks")
+                try:
+                    handle_tasks(tasks, kombit_access, executor)
+                    logging.info(f"{len(tasks)} tasks done")
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logging.exception(f"Handling {len(tasks)} tasks failed. The tasks are marked as failed.")
+                    fail_tasks(tasks)
+                # Shipments may be waiting for their registration job to finish
+                worker_signal.notify(worker_signal.Channel.SHIPMENT)
+            else:
+                logging.debug(f"Waiting for up to {config.REGISTRATION_WORKER_SLEEP_TIME} seconds")
+                listener.wait(config.REGISTRATION_WORKER_SLEEP_TIME)
+
+
+def get_waiting_tasks(batch_size: int) -> tuple[RegistrationTask]:
+    """Get a batch of registration tasks that have the status "waiting".
+    Set their status to "checking" in a single transaction.
 
-
-def get_waiting_task() -> RegistrationTask | None:
-    """Get a registration task that has the status "waiting".
-    Set its status to "checking".
+    Args:
+        batch_size: The maximum number of tasks to claim.
 
     Returns:
-        A waiting registration task if any.
+        A tuple of the claimed tasks. Empty if no tasks are waiting.
     """
     with connection.get_session() as session:
         sub_q = (
             select(RegistrationTask.id)
             .where(RegistrationTask.status == TaskStatus.WAITING)
-            .limit(1)
-            .scalar_subquery()
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
         )
 
         q = (
             update(RegistrationTask)
-            .where(RegistrationTask.id == sub_q)
+            .where(RegistrationTask.id.in_(sub_q))
             .values(
                 status=TaskStatus.CHECKING,
                 updated_at=datetime.now()
@@ -67,48 +79,53 @@ def get_waiting_task() -> RegistrationTask | None:
             .returning(RegistrationTask)
         )
 
-        task = session.execute(q).scalar()
-        if task:
+        tasks = tuple(session.execute(q).scalars())
+        if tasks:
             session.commit()
 
-    return task
+    return tasks
 
 
-def handle_task(task: RegistrationTask, kombit_access: KombitAccess):
-    """Handle the registration task looking up registration in the Kombit API.
-    Set the result and status to "checked".
+def handle_tasks(tasks: tuple[RegistrationTask], kombit_access: KombitAccess, executor: ThreadPoolExecutor):
+    """Handle the registration tasks looking up registrations in the Kombit API concurrently.
+    The results of all tasks are written to the database in a single bulk update.
+    Tasks that raise an exception are marked as failed.
 
     Args:
-        task: The task to handle.
+        tasks: The tasks to handle.
         kombit_access: The KombitAccess object to authenticate against the Kombit API.
+        executor: The thread pool used to perform the lookups.
     """
-    job = registration_job.get_registration_job(task.job_id)
-    result = digital_post.is_registered(task.registrant_id, job.job_type.value, kombit_access)
+    job_types = {job_id: registration_job.get_registration_job(job_id).job_type for job_id in {task.job_id for task in tasks}}
+
+    futures = [
+        executor.submit(registration_util.is_registered, task.registrant_id, job_types[task.job_id], kombit_access)
+        for task in tasks
+    ]
+
+    values = []
+    for task, future in zip(tasks, futures):
+        try:
+            values.append({"id": task.id, "result": future.result(), "status": TaskStatus.CHECKED, "updated_at": datetime.now()})
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            values.append({"id": task.id, "result": None, "status": TaskStatus.FAILED, "updated_at": datetime.now()})
+            logging.error(f"Task failed {task.id}: {e}")
 
     with connection.get_session() as session:
-        q = (
-            update(RegistrationTask)
-            .where(RegistrationTask.id == task.id)
-            .values(
-                result=result,
-                status=TaskStatus.CHECKED,
-                updated_at=datetime.now()
-            )
-        )
-        session.execute(q)
+        session.execute(update(RegistrationTask), values)
         session.commit()
 
 
-def fail_task(task: RegistrationTask):
-    """Mark a task as failed.
+def fail_tasks(tasks: tuple[RegistrationTask]):
+    """Mark multiple tasks as failed.
 
     Args:
-        task: The task to mark as failed.
+        tasks: The tasks to mark as failed.
     """
     with connection.get_session() as session:
         q = (
             update(RegistrationTask)
-            .where(RegistrationTask.id == task.id)
+            .where(RegistrationTask.id.in_([task.id for task in tasks]))
             .values(
                 status=TaskStatus.FAILED,
                 updated_at=datetime.now()
@@ -0,0 +1,233 @@
+"""This module defines the worker process that renders letters ahead of sending.
+Letters are merged and converted to pdf as soon as they are added to the database
+and the result is saved in the document storage. This way the shipment worker
+only needs to read the finished pdf when sending.
+It is spawned as a separate process next to the UI process.
+"""
+
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import itertools
+import json
+import logging
+
+from sqlalchemy import select, update
+
+from OpenPostbud import config
+from OpenPostbud.database import connection, document_storage
+from OpenPostbud.database.digital_post import letters, templates
+from OpenPostbud.database.digital_post.letters import Letter, RenderStatus
+from OpenPostbud.database.digital_post.templates import Template
+from OpenPostbud.database.digital_post.shipments import Shipment
+from OpenPostbud.database.common import ShipmentStatus
+from OpenPostbud.utils import docx_util, worker_signal
+
+
+def start_process():
+    """The entry point of the worker process."""
+    logging.info(f"Render worker started. Merge processes: {config.MERGE_PROCESSES}")
+
+    # Letters claimed before a restart would otherwise never be rendered
+    reset_count = letters.reset_rendering_letters()
+    if reset_count:
+        logging.info(f"Reset {reset_count} letters left in rendering")
+
+    merge_pool = docx_util.MergePool(config.MERGE_PROCESSES)
+    with worker_signal.SignalListener(worker_signal.Channel.RENDER) as listener:
+        while True:
+            letter_batch = get_unrendered_letters(config.RENDER_WORKER_BATCH_SIZE)
+            if letter_batch:
+                logging.info(f"Unrendered letters found: {len(letter_batch)}")
+                try:
+                    render_batch(letter_batch, merge_pool)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logging.exception("Rendering letter batch failed. The letters will be retried.")
+                    letters.set_render_status([letter.id for letter in letter_batch], RenderStatus.WAITING)
+                    listener.wait(config.RENDER_WORKER_SLEEP_TIME)
+            else:
+                logging.debug(f"Waiting for up to {config.RENDER_WORKER_SLEEP_TIME} seconds")
+                listener.wait(config.RENDER_WORKER_SLEEP_TIME)
+
+
+def get_unrendered_letters(batch_size: int) -> tuple[Letter]:
+    """Get a batch of waiting letters that haven't been rendered yet
+    and set their render status to 'rendering'.
+    Letters are claimed in the order their shipments were created.
+
+    Args:
+        batch_size: The maximum number of letters to claim.
+
+    Returns:
+        A tuple of the claimed letters. Empty if no letters need rendering.
+    """
+    with connection.get_session() as session:
+        sub_q = (
+            select(Letter.id)
+            .join(Shipment, Letter.shipment_id == Shipment.id)
+            .where(
+                Letter.status == ShipmentStatus.WAITING,
+                Letter.render_status == RenderStatus.WAITING
+            )
+            .order_by(Shipment.created_at, Letter.shipment_id, Letter.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True, of=Letter)
+        )
+
+        q = (
+            update(Letter)
+            .where(Letter.id.in_(sub_q))
+            .values(render_status=RenderStatus.RENDERING)
+            .returning(Letter)
+        )
+
+        letter_batch = tuple(session.execute(q).scalars())
+        if letter_batch:
+            session.commit()
+
+    return tuple(sorted(letter_batch, key=lambda letter: (letter.shipment_id, letter.id)))
+
+
+def render_batch(letter_batch: tuple[Letter], merge_pool: docx_util.MergePool):
+    """Render a batch of letters. If the batch fails it is split in halves
+    which are rendered separately, until the letters that make rendering fail
+    are found. A single letter that fails is marked as failed and will instead
+    be rendered when it is sent. This way one letter that e.g. crashes the merge
+    process can't hold back the letters behind it.
+
+    Args:
+        letter_batch: The letters to render.
+        merge_pool: The process pool used to merge the letters.
+    """
+    try:
+        render_letters(letter_batch, merge_pool)
+    except Exception:  # pylint: disable=broad-exception-caught
+        if len(letter_batch) == 1:
+            logging.exception(f"Rendering letter {letter_batch[0].id} failed. It will be rendered when sent.")
+            letters.set_render_status([letter_batch[0].id], RenderStatus.FAILED)
+            return
+
+        logging.exception(f"Rendering {len(letter_batch)} letters failed. Retrying in halves.")
+        middle = len(letter_batch) // 2
+        render_batch(letter_batch[:middle], merge_pool)
+        render_batch(letter_batch[middle:], merge_pool)
+
+
+def render_letters(letter_batch: tuple[Letter], merge_pool: docx_util.MergePool):
+    """Render each letter to the document storage and update their render status.
+    Letters with identical content share a render hash and are only rendered once.
+    Documents are merged in parallel in the merge pool and converted to pdf in
+    batches of CONVERTER_BATCH_SIZE.
+    If rendering fails the letter is marked as failed and will instead be
+    rendered when it is sent. If the merge pool breaks the error is raised
+    so the caller can narrow down the letter causing it.
+
+    Args:
+        letter_batch: The letters to render.
+        merge_pool: The process pool used to merge the letters.
+    """
+    rendered = []
+    failed = []
+
+    for shipment_id, shipment_letters in itertools.groupby(letter_batch, key=lambda letter: letter.shipment_id):
+        template = templates.get_template_by_shipment(shipment_id)
+        shipment_letters = tuple(shipment_letters)
+
+        # Pdf templates are sent as is and don't need rendering
+        if not template.file_name.endswith(".docx"):
+            rendered.extend(letter.id for letter in shipment_letters)
+            continue
+
+        letters_by_hash: dict[str, list[Letter]] = {}
+        for letter in shipment_letters:
+            letters_by_hash.setdefault(letter.get_render_hash(), []).append(letter)
+
+        # Only render documents that haven't already been rendered for other letters
+        field_data_by_hash = {
+            render_hash: json.loads(hash_letters[0].field_data)
+            for render_hash, hash_letters in letters_by_hash.items()
+            if not document_storage.rendered_doc_exists(shipment_id, render_hash)
+        }
+        logging.info(f"Rendering {len(field_data_by_hash)} unique documents for {len(shipment_letters)} letters")
+
+        merged, failed_hashes = _merge_documents(field_data_by_hash, template, merge_pool)
+
+        for chunk in itertools.batched(merged.items(), config.CONVERTER_BATCH_SIZE):
+            failed_hashes.extend(_convert_chunk(shipment_id, chunk))
+
+        for render_hash, hash_letters in letters_by_hash.items():
+            target = failed if render_hash in failed_hashes else rendered
+            target.extend(letter.id for letter in hash_letters)
+
+    if rendered:
+        letters.set_render_status(rendered, RenderStatus.RENDERED)
+    if failed:
+        letters.set_render_status(failed, RenderStatus.FAILED)
+
+
+def _merge_documents(field_data_by_hash: dict[str, dict[str, str]], template: Template, merge_pool: docx_util.MergePool) -> tuple[dict[str, bytes], list[str]]:
+    """Merge the given field data with the template in the merge pool.
+
+    Args:
+        field_data_by_hash: A dict of render hashes to merge field data.
+        template: The docx template to merge.
+        merge_pool: The process pool used to merge the documents.
+
+    Returns:
+        A tuple of (dict of render hashes to merged Word files, failed render hashes).
+
+    Raises:
+        BrokenProcessPool: If a merge process died. The pool is shut down so it is
+            recreated on the next merge, and the batch should be retried.
+    """
+    start_time = datetime.now()
+
+    merged = {}
+    failed = []
+
+    try:
+        futures = merge_pool.submit_merges(template.file_data, list(field_data_by_hash.values()))
+
+        for render_hash, future in zip(field_data_by_hash, futures):
+            try:
+                merged[render_hash] = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                failed.append(render_hash)
+                logging.error(f"Merging document {render_hash} failed: {e}")
+    except BrokenProcessPool:
+        logging.error("The merge pool broke. Restarting it.")
+        merge_pool.shutdown()
+        raise
+
+    logging.info(f"Merged {len(merged)} documents in {(datetime.now() - start_time).total_seconds():.2f} seconds")
+    return merged, failed
+
+
+def _convert_chunk(shipment_id: str, chunk: tuple[tuple[str, bytes]]) -> list[str]:
+    """Convert the given merged documents to pdf in a single conversion request.
+    The pdfs are saved to the document storage.
+
+    Args:
+        shipment_id: The id of the shipment the documents belong to.
+        chunk: A tuple of (render hash, merged Word file) pairs.
+
+    Returns:
+        A list of render hashes that failed to convert.
+    """
+    try:
+        start_time = datetime.now()
+        pdfs = docx_util.convert_word_files_to_pdf([word_file for _, word_file in chunk])
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.error(f"Converting {len(chunk)} documents failed: {e}")
+        return [render_hash for render_hash, _ in chunk]
+
+    for (render_hash, _), pdf in zip(chunk, pdfs):
+        document_storage.save_rendered_doc(shipment_id, render_hash, pdf)
+
+    logging.info(f"Converted {len(pdfs)} documents in {(datetime.now() - start_time).total_seconds():.2f} seconds")
+    return []
+
+
+if __name__ == '__main__':
+    start_process()
@@ -3,14 +3,15 @@ It is spawned as a separate process next to the UI process.
 """
 
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import lru_cache
+from itertools import repeat
 import logging
-import time
 import uuid
 import json
 
-from sqlalchemy import select, update
+from sqlalchemy import and_, exists, or_, select, update
 from python_serviceplatformen.authentication import KombitAccess
 from python_serviceplatformen import digital_post
 from python_serviceplatformen.models.message import Message, MessageHeader, MessageBody, MainDocument, Sender, Recipient, File, AdditionalDocument
@@ -24,6 +25,10 @@ from OpenPostbud.database.digital_post import shipments
 from OpenPostbud.database.digital_post.shipments import Shipment
 from OpenPostbud.database.common import ShipmentStatus, PostType
 from OpenPostbud.database import document_storage
+from OpenPostbud.database.check_registration import registration_task
+from OpenPostbud.database.check_registration.registration_job import JobType
+from OpenPostbud.database.check_registration.registration_task import RegistrationTask, TaskStatus
+from OpenPostbud.utils import registration_util, worker_signal
 
 
 # Maximum size of files before base 64 encoding accepted by the receiving APIs.
@@ -33,41 +38,66 @@ PHYSICAL_MAX_PAYLOAD_BYTES = 7 * 1024 * 1024
 
 def start_process():
     """The entry point of the worker process.
+    Letters are claimed in batches and up to SHIPMENT_WORKER_CONCURRENCY
+    letters from each batch are sent concurrently.
 
     Raises:
         ValueError: If the Kombit certificate file couldn't be found.
     """
     kombit_access = KombitAccess(config.CVR, config.KOMBIT_CERT_PATH, test=config.KOMBIT_TEST_ENV)
 
-    logging.info("Shipment worker started")
-
-    while True:
-        letter = get_waiting_letter()
-        if letter:
-            logging.info(f"Waiting letter found: {letter.id}")
-            try:
-                send_letter(letter, kombit_access)
-            except Timeout:
-                letter.set_status(ShipmentStatus.WAITING, message="Timeout. Prøver igen.")
-                logging.error(f"Sending letter {letter.id} timed out.")
-            except HTTPError as e:
-                response_body = e.response.text if e.response is not None else ""
-                letter.set_status(ShipmentStatus.FAILED, message=f"Systemfejl: {e.__class__.__name__}")
-                logging.error(f"Sending letter {letter.id} failed: {e} - Response: {response_body!r}")
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                letter.set_status(ShipmentStatus.FAILED, message=f"Systemfejl: {e.__class__.__name__}")
-                logging.error(f"Sending letter {letter.id} failed: {e}")
-        else:
-            logging.debug(f"Sleeping for {config.SHIPMENT_WORKER_SLEEP_TIME} seconds")
-            time.sleep(config.SHIPMENT_WORKER_SLEEP_TIME)
+    logging.info(f"Shipment worker started. Concurrency: {config.SHIPMENT_WORKER_CONCURRENCY}")
+
+    with ThreadPoolExecutor(max_workers=config.SHIPMENT_WORKER_CONCURRENCY) as executor, worker_signal.SignalListener(worker_signal.Channel.SHIPMENT) as listener:
+        while True:
+            letters = get_waiting_letters(config.SHIPMENT_WORKER_BATCH_SIZE)
+            if letters:
+                logging.info(f"Waiting letters found: {len(letters)}")
+                # Wait for the entire batch before claiming more letters.
+                # handle_letter catches all exceptions so nothing is raised here.
+                list(executor.map(handle_letter, letters, repeat(kombit_access)))
+            else:
+                logging.debug(f"Waiting for up to {config.SHIPMENT_WORKER_SLEEP_TIME} seconds")
+                listener.wait(config.SHIPMENT_WORKER_SLEEP_TIME)
+
 
+def handle_letter(letter: Letter, kombit_access: KombitAccess):
+    """Send a single claimed letter and set its status if sending fails.
 
-def get_waiting_letter() -> Letter | None:
-    """Get a waiting letter from the database
-    and set its status to 'sending'.
+    Args:
+        letter: The letter to send. It's assumed the letter has been claimed by the worker.
+        kombit_access: The KombitAccess object to authenticate against the Kombit API.
+    """
+    logging.info(f"Handling letter: {letter.id}")
+    try:
+        send_letter(letter, kombit_access)
+    except Timeout:
+        letter.set_status(ShipmentStatus.WAITING, message="Timeout. Prøver igen.")
+        worker_signal.notify(worker_signal.Channel.SHIPMENT, delay=config.SHIPMENT_WORKER_DELAY)
+        logging.error(f"Sending letter {letter.id} timed out.")
+    except HTTPError as e:
+        response_body = e.response.text if e.response is not None else ""
+        letter.set_status(ShipmentStatus.FAILED, message=f"Systemfejl: {e.__class__.__name__}")
+        logging.error(f"Sending letter {letter.id} failed: {e} - Response: {response_body!r}")
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        letter.set_status(ShipmentStatus.FAILED, message=f"Systemfejl: {e.__class__.__name__}")
+        logging.error(f"Sending letter {letter.id} failed: {e}")
+
+
+def get_waiting_letters(batch_size: int) -> tuple[Letter]:
+    """Get a batch of waiting letters from the database
+    and set their status to 'sending' in a single transaction.
+    Letters are claimed in the order their shipments were created.
+    Letters are not claimed while their shipment's registration job is unfinished.
+    Tasks that have been checking for longer than REGISTRATION_TASK_TIMEOUT
+    don't hold back the letters, which then look up the recipient when sent.
+    On PostgreSQL letters locked by another worker are skipped.
+
+    Args:
+        batch_size: The maximum number of letters to claim.
 
     Returns:
-        A waiting letter if any.
+        A tuple of the claimed letters. Empty if no letters are waiting.
     """
     with connection.get_session() as session:
         sub_q = (
@@ -75,16 +105,26 @@ def get_waiting_letter() -> Letter | None:
             .join(Shipment, Letter.shipment_id == Shipment.id)
             .where(
                 Letter.status == ShipmentStatus.WAITING,
-                datetime.now() - timedelta(seconds=config.SHIPMENT_WORKER_DELAY) > Letter.updated_at
+                datetime.now() - timedelta(seconds=config.SHIPMENT_WORKER_DELAY) > Letter.updated_at,
+                ~exists().where(
+                    RegistrationTask.job_id == Shipment.registration_job_id,
+                    or_(
+                        RegistrationTask.status == TaskStatus.WAITING,
+                        and_(
+                            RegistrationTask.status == TaskStatus.CHECKING,
+                            RegistrationTask.updated_at > datetime.now() - timedelta(seconds=config.REGISTRATION_TASK_TIMEOUT)
+                        )
+                    )
+                )
             )
-            .order_by(Shipment.created_at, Letter.shipment_id)
-            .limit(1)
-            .scalar_subquery()
+            .order_by(Shipment.created_at, Letter.shipment_id, Letter.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True, of=Letter)
         )
 
         q = (
             update(Letter)
-            .where(Letter.id == sub_q)
+            .where(Letter.id.in_(sub_q))
             .values(
                 status=ShipmentStatus.SENDING,
                 updated_at=datetime.now()
@@ -92,19 +132,22 @@ def get_waiting_letter() -> Letter | None:
             .returning(Letter)
         )
 
-        letter = session.execute(q).scalar()
-        if letter:
+        letters = tuple(session.execute(q).scalars())
+        if letters:
             session.commit()
-            return letter
 
-    return None
+    # RETURNING doesn't guarantee any order so keep letters grouped by shipment
+    # to make proper use of the template and attachment caches.
+    return tuple(sorted(letters, key=lambda letter: (letter.shipment_id, letter.id)))
 
 
 def send_letter(letter: Letter, kombit_access: KombitAccess):
     """Send a letter according to its shipment's post type.
 
     Digital Post and Auto shipments first check if the recipient is registered
-    for Digital Post. Digital shipments fail if the recipient isn't registered,
+    for Digital Post. The result of the shipment's registration job is used
+    and the recipient is only looked up if the job has no result for them.
+    Digital shipments fail if the recipient isn't registered,
     while Auto shipments fall back to physical mail. Physical shipments are
     always sent as physical mail.
     """
@@ -114,7 +157,12 @@ def send_letter(letter: Letter, kombit_access: KombitAccess):
         send_physical(letter, kombit_access)
         return
 
-    is_registered = digital_post.is_registered(letter.recipient_id, 'digitalpost', kombit_access)
+    is_registered = None
+    if shipment.registration_job_id:
+        is_registered = registration_task.get_registration_result(shipment.registration_job_id, letter.recipient_id)
+
+    if is_registered is None:
+        is_registered = registration_util.is_registered(letter.recipient_id, JobType.DIGITAL_POST, kombit_access)
 
     if shipment.post_type == PostType.DIGITAL:
         if not is_registered: